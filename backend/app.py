@@ -1,7 +1,11 @@
 # Main Flask Application
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, Response, stream_with_context, g
 from flask_cors import CORS
 from config import Config
+from utils.streaming import sse_event
+from utils.http_cache import conditional_response
+from utils.auth_tokens import login_required
+from utils.invalidation import invalidation_bus
 
 from routes.auth import auth_bp
 from routes.services import services_bp
@@ -29,43 +33,186 @@ app.register_blueprint(clients_bp, url_prefix='/api/clients')
 app.register_blueprint(companies_bp, url_prefix='/api/companies')
 app.register_blueprint(maps_bp, url_prefix='/api/maps')
 
+# ETags / 304s and compression for GET responses
+app.after_request(conditional_response)
+
+# Receive invalidations published by the other workers
+invalidation_bus.start()
+
 # ---------------- VOICE ----------------
 
 @app.route('/api/voice/transcribe', methods=['POST'])
 def transcribe_audio():
     from services.voice_service import voice_service
+    from services.transcription_jobs import transcription_jobs, QueueFullError
+    from utils.audio import AudioRejectedError
 
     if 'audio' not in request.files:
         return jsonify({'error': 'No audio file'}), 400
 
     audio_file = request.files['audio']
-    transcript = voice_service.transcribe_audio(audio_file)
-
-    if transcript:
-        return jsonify({'text': transcript}), 200
+    mode = request.args.get('mode') or request.form.get('mode') or 'async'
+    if (request.content_length or 0) > Config.VOICE_MAX_UPLOAD_BYTES:
+        return jsonify({'error': 'Recording is too large'}), 413
+
+    # Identical audio transcribed before: answer without queueing
+    audio_key = voice_service.audio_key(audio_file.stream)
+    transcript = voice_service.cache.get(audio_key)
+    if transcript is not None:
+        return jsonify({'text': transcript, 'cached': True}), 200
+
+    # Small clips may still be transcribed inline when explicitly asked for
+    size = request.content_length or 0
+    if mode == 'sync' and 0 < size <= Config.VOICE_SYNC_MAX_BYTES:
+        try:
+            transcript = voice_service.transcribe_audio(audio_file, audio_key)
+        except AudioRejectedError as e:
+            return jsonify({'error': str(e)}), 413
+        if transcript is not None:
+            return jsonify({'text': transcript}), 200
+        return jsonify({'error': 'Transcription failed'}), 500
 
-    return jsonify({'error': 'Transcription failed'}), 500
+    try:
+        job = transcription_jobs.submit(audio_file, audio_key)
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 503
+
+    return jsonify({
+        'job_id': job['id'],
+        'status': job['status'],
+        'status_url': f"/api/voice/jobs/{job['id']}"
+    }), 202
+
+
+@app.route('/api/voice/jobs/<job_id>', methods=['GET'])
+def get_transcription_job(job_id):
+    from services.transcription_jobs import transcription_jobs
+
+    job = transcription_jobs.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job), 200
+
+
+@app.route('/api/voice/search', methods=['POST'])
+def voice_search():
+    """
+    Transcribe a recording and search for it in one request. Streams
+    server-sent events as each step completes: transcript, database
+    matches, Google Maps fallback results, then a summary.
+
+    Only cached or small (VOICE_SYNC_MAX_BYTES) recordings are transcribed
+    inline. Larger ones are queued like /api/voice/transcribe and answered
+    with 202 and the job; once it is done, post its job_id (instead of
+    audio) with the same filters to stream the search.
+    """
+    import json
+    from services.voice_service import voice_service
+    from services.search_service import search_service
+    from services.transcription_jobs import transcription_jobs, QueueFullError
+    from utils.audio import AudioRejectedError
+    from utils.validators import parse_int
+
+    filters = {
+        'category': request.form.get('category', ''),
+        'price': request.form.get('price', ''),
+        'rating': request.form.get('rating', ''),
+        'distance': request.form.get('distance', ''),
+    }
+    try:
+        user_location = json.loads(request.form.get('user_location') or 'null')
+    except ValueError:
+        user_location = None
+    limit = parse_int(request.form.get('limit'), Config.SEARCH_DEFAULT_LIMIT, 1, Config.SEARCH_MAX_LIMIT)
+
+    transcribe = None
+    job_id = request.form.get('job_id')
+    if job_id:
+        job = transcription_jobs.get(job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        if job['status'] != 'done':
+            return jsonify({'error': 'Transcription is not finished', 'status': job['status']}), 409
+        text = job.get('text')
+    else:
+        if 'audio' not in request.files:
+            return jsonify({'error': 'No audio file'}), 400
+        size = request.content_length or 0
+        if size > Config.VOICE_MAX_UPLOAD_BYTES:
+            return jsonify({'error': 'Recording is too large'}), 413
+
+        audio_file = request.files['audio']
+        audio_key = voice_service.audio_key(audio_file.stream)
+        text = voice_service.cache.get(audio_key)
+        if text is None and not 0 < size <= Config.VOICE_SYNC_MAX_BYTES:
+            # Too long to transcribe on a request worker
+            try:
+                job = transcription_jobs.submit(audio_file, audio_key)
+            except QueueFullError as e:
+                return jsonify({'error': str(e)}), 503
+            return jsonify({
+                'job_id': job['id'],
+                'status': job['status'],
+                'status_url': f"/api/voice/jobs/{job['id']}"
+            }), 202
+        if text is None:
+            def transcribe():
+                return voice_service.transcribe_audio(audio_file, audio_key)
+
+    def generate():
+        transcript = text
+        if transcribe:
+            try:
+                transcript = transcribe()
+            except AudioRejectedError as e:
+                yield sse_event('error', {'error': str(e)})
+                return
+            except Exception as e:
+                print(f"Voice search transcription error: {e}")
+                yield sse_event('error', {'error': 'Transcription failed'})
+                return
+
+        yield sse_event('transcript', {'text': transcript or ''})
+        if not transcript:
+            yield sse_event('done', {'total': 0, 'sources': [], 'timed_out': False})
+            return
+
+        for event, data in search_service.search_stages(transcript, filters, limit, 0, user_location):
+            yield sse_event(event, data)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 
 # ---------------- FAVORITES ----------------
 
 @app.route('/api/favorites', methods=['GET'])
+@login_required
 def get_favorites():
     from services.supabase_service import supabase_service
 
-    client_id = request.args.get('client_id', default=1, type=int)
-    favorites = supabase_service.get_favorites(client_id)
+    from utils.pagination import page_args
+    from utils.validators import parse_fields
+
+    client_id = g.user_id
+    try:
+        limit, after = page_args(request.args)
+        columns = parse_fields('favorites', request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    favorites = supabase_service.get_favorites(client_id, limit, after, columns)
 
-    return jsonify({'favorites': favorites}), 200
+    return jsonify({'favorites': favorites, 'next_cursor': favorites.next_cursor}), 200
 
 
 @app.route('/api/favorites', methods=['POST'])
+@login_required
 def add_favorite():
     from services.supabase_service import supabase_service
 
     data = request.get_json(silent=True) or {}
 
-    client_id = data.get('client_id', 1)
+    client_id = g.user_id
     service_id = data.get('service_id')
 
     if not service_id:
@@ -81,10 +228,11 @@ def add_favorite():
 
 
 @app.route('/api/favorites/<int:service_id>', methods=['DELETE'])
+@login_required
 def remove_favorite(service_id):
     from services.supabase_service import supabase_service
 
-    client_id = request.args.get('client_id', default=1, type=int)
+    client_id = g.user_id
 
     try:
         supabase_service.remove_favorite(client_id, service_id)
@@ -98,7 +246,16 @@ def remove_favorite(service_id):
 
 @app.route('/api/health', methods=['GET'])
 def health():
-    return jsonify({'status': 'ok'}), 200
+    from utils.http_client import providers
+    from services.supabase_service import supabase_service
+
+    return jsonify({
+        'status': 'ok',
+        'providers': {name: provider.stats() for name, provider in providers.items()},
+        'users': supabase_service.user_cache_stats(),
+        'catalogue': supabase_service.catalogue_stats(),
+        'invalidation': invalidation_bus.stats()
+    }), 200
 
 @app.route('/', methods=['GET'])
 def root():
@@ -1,5 +1,6 @@
 # Configuration
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -9,16 +10,119 @@ class Config:
     # Supabase
     SUPABASE_URL = os.getenv('SUPABASE_URL', '')
     SUPABASE_KEY = os.getenv('SUPABASE_KEY', '')
+    # Data engine: 'supabase' or 'sqlite' (embedded, for offline development and load tests)
+    DB_ENGINE = os.getenv('DB_ENGINE', 'supabase').lower()
+    SQLITE_PATH = os.getenv('SQLITE_PATH', os.path.join(os.path.dirname(__file__), 'data', 'aurum.sqlite3'))
 
     # OpenAI
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
+    OPENAI_CACHE_SIZE = int(os.getenv('OPENAI_CACHE_SIZE', '4096'))
+    OPENAI_CACHE_TTL = int(os.getenv('OPENAI_CACHE_TTL', str(24 * 3600)))
+
+    # User records cached by id and email; unknown emails are cached briefly too
+    USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', '10000'))
+    USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', '300'))
+    USER_NEGATIVE_TTL = int(os.getenv('USER_NEGATIVE_TTL', '60'))
+    # Bloom filter of registered emails, rebuilt from the users table periodically
+    USER_BLOOM_CAPACITY = int(os.getenv('USER_BLOOM_CAPACITY', '100000'))
+    USER_BLOOM_ERROR_RATE = float(os.getenv('USER_BLOOM_ERROR_RATE', '0.01'))
+    USER_BLOOM_REFRESH = int(os.getenv('USER_BLOOM_REFRESH', '600'))
+
+    # In-memory mirror of services / masters / companies / work examples / promotions:
+    # delta sync on updated_at, full reload (picks up deletes), max age before reads hit the database
+    MIRROR_ENABLED = os.getenv('MIRROR_ENABLED', 'true').lower() == 'true'
+    MIRROR_SYNC_INTERVAL = int(os.getenv('MIRROR_SYNC_INTERVAL', '5'))
+    MIRROR_FULL_SYNC_INTERVAL = int(os.getenv('MIRROR_FULL_SYNC_INTERVAL', '300'))
+    MIRROR_MAX_STALENESS = int(os.getenv('MIRROR_MAX_STALENESS', '30'))
+
+    # Cross-worker invalidation: one Unix datagram socket per worker process in this directory
+    INVALIDATION_ENABLED = os.getenv('INVALIDATION_ENABLED', 'true').lower() == 'true'
+    INVALIDATION_DIR = os.getenv('INVALIDATION_DIR', os.path.join(tempfile.gettempdir(), 'aurum-invalidation'))
 
     # Google Maps
     GOOGLE_MAPS_API_KEY = os.getenv('GOOGLE_MAPS_API_KEY', '')
 
+    # Maps lookup cache (TTLs in seconds)
+    MAPS_CACHE_PATH = os.getenv('MAPS_CACHE_PATH', os.path.join(os.path.dirname(__file__), 'cache', 'maps.sqlite3'))
+    MAPS_CACHE_SIZE = int(os.getenv('MAPS_CACHE_SIZE', '2048'))
+    MAPS_GEOCODE_TTL = int(os.getenv('MAPS_GEOCODE_TTL', str(30 * 24 * 3600)))
+    MAPS_REVERSE_GEOCODE_TTL = int(os.getenv('MAPS_REVERSE_GEOCODE_TTL', str(7 * 24 * 3600)))
+    MAPS_PLACE_DETAILS_TTL = int(os.getenv('MAPS_PLACE_DETAILS_TTL', str(24 * 3600)))
+    MAPS_NEGATIVE_TTL = int(os.getenv('MAPS_NEGATIVE_TTL', '300'))
+    # Place searches are shared per geohash cell (precision 6 is about 1.2 x 0.6 km)
+    MAPS_SEARCH_TTL = int(os.getenv('MAPS_SEARCH_TTL', str(6 * 3600)))
+    MAPS_SEARCH_GEOHASH_PRECISION = int(os.getenv('MAPS_SEARCH_GEOHASH_PRECISION', '6'))
+    # Upper bound on origins x destinations per distance-matrix request
+    MAPS_MATRIX_MAX_CELLS = int(os.getenv('MAPS_MATRIX_MAX_CELLS', '10000'))
+
+    # Service search paging
+    SEARCH_DEFAULT_LIMIT = int(os.getenv('SEARCH_DEFAULT_LIMIT', '20'))
+    SEARCH_MAX_LIMIT = int(os.getenv('SEARCH_MAX_LIMIT', '100'))
+    # Responses over this many bytes are gzip/brotli compressed when the client accepts it
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '1024'))
+    COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', '6'))
+    # Page size of list endpoints (bookings, favorites, masters, reviews, ...)
+    PAGE_DEFAULT_LIMIT = int(os.getenv('PAGE_DEFAULT_LIMIT', '50'))
+    PAGE_MAX_LIMIT = int(os.getenv('PAGE_MAX_LIMIT', '200'))
+    # Run the database query and OpenAI filter generation concurrently
+    SEARCH_PIPELINED = os.getenv('SEARCH_PIPELINED', 'True').lower() == 'true'
+    # Overall deadline for a search in seconds
+    SEARCH_DEADLINE = float(os.getenv('SEARCH_DEADLINE', '15'))
+    # Below this confidence the local intent classifier defers to OpenAI
+    INTENT_CONFIDENCE_THRESHOLD = float(os.getenv('INTENT_CONFIDENCE_THRESHOLD', '0.6'))
+
+    # Concurrent fan-out of independent lookups (e.g. service detail page)
+    FANOUT_WORKERS = int(os.getenv('FANOUT_WORKERS', '16'))
+    FANOUT_TIMEOUT = float(os.getenv('FANOUT_TIMEOUT', '10'))
+
+    # Booking availability
+    WORK_DAY_START = os.getenv('WORK_DAY_START', '09:00')
+    WORK_DAY_END = os.getenv('WORK_DAY_END', '18:00')
+    AVAILABILITY_SLOT_MINUTES = int(os.getenv('AVAILABILITY_SLOT_MINUTES', '15'))
+    AVAILABILITY_MAX_DAYS = int(os.getenv('AVAILABILITY_MAX_DAYS', '31'))
+
     # ElevenLabs
     ELEVENLABS_API_KEY = os.getenv('ELEVENLABS_API_KEY', '')
+    # Transcription jobs: uploads are spooled here and processed in the background
+    VOICE_SPOOL_DIR = os.getenv('VOICE_SPOOL_DIR', os.path.join(os.path.dirname(__file__), 'cache', 'voice'))
+    VOICE_WORKERS = int(os.getenv('VOICE_WORKERS', '4'))
+    VOICE_MAX_PENDING = int(os.getenv('VOICE_MAX_PENDING', '64'))
+    VOICE_JOB_TTL = int(os.getenv('VOICE_JOB_TTL', '3600'))
+    # Largest upload that may still be transcribed synchronously (mode=sync)
+    VOICE_SYNC_MAX_BYTES = int(os.getenv('VOICE_SYNC_MAX_BYTES', str(256 * 1024)))
+    # Uploads are downmixed, resampled and silence-trimmed before transcription
+    VOICE_NORMALIZE = os.getenv('VOICE_NORMALIZE', 'true').lower() == 'true'
+    VOICE_SAMPLE_RATE = int(os.getenv('VOICE_SAMPLE_RATE', '16000'))
+    VOICE_SILENCE_THRESHOLD = float(os.getenv('VOICE_SILENCE_THRESHOLD', '0.01'))  # RMS, full scale = 1
+    VOICE_MAX_SECONDS = int(os.getenv('VOICE_MAX_SECONDS', '120'))
+    VOICE_MAX_UPLOAD_BYTES = int(os.getenv('VOICE_MAX_UPLOAD_BYTES', str(25 * 1024 * 1024)))
+    # Codec for the normalized upload (needs ffmpeg): 'libopus' (Ogg) or 'flac'
+    VOICE_ENCODE_CODEC = os.getenv('VOICE_ENCODE_CODEC', 'libopus')
+    VOICE_ENCODE_BITRATE = os.getenv('VOICE_ENCODE_BITRATE', '24k')
+    # Transcripts cached by audio content hash
+    VOICE_CACHE_PATH = os.getenv('VOICE_CACHE_PATH', os.path.join(os.path.dirname(__file__), 'cache', 'voice.sqlite3'))
+    VOICE_CACHE_TTL = int(os.getenv('VOICE_CACHE_TTL', str(7 * 24 * 3600)))
+    VOICE_CACHE_MAX_ENTRIES = int(os.getenv('VOICE_CACHE_MAX_ENTRIES', '10000'))
+
+    # Outbound HTTP to external providers
+    HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', '2'))
+    HTTP_BACKOFF_BASE = float(os.getenv('HTTP_BACKOFF_BASE', '0.25'))
+    # Seconds to wait for a free slot before failing fast
+    HTTP_ACQUIRE_TIMEOUT = float(os.getenv('HTTP_ACQUIRE_TIMEOUT', '2'))
+    HTTP_BREAKER_THRESHOLD = int(os.getenv('HTTP_BREAKER_THRESHOLD', '5'))
+    HTTP_BREAKER_RESET = float(os.getenv('HTTP_BREAKER_RESET', '30'))
+    ELEVENLABS_MAX_CONCURRENCY = int(os.getenv('ELEVENLABS_MAX_CONCURRENCY', '4'))
+    SERPAPI_MAX_CONCURRENCY = int(os.getenv('SERPAPI_MAX_CONCURRENCY', '8'))
+    OPENAI_MAX_CONCURRENCY = int(os.getenv('OPENAI_MAX_CONCURRENCY', '8'))
 
     # Flask
-    SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
+    DEFAULT_SECRET_KEY = 'dev-secret-key-change-in-production'
+    SECRET_KEY = os.getenv('SECRET_KEY', DEFAULT_SECRET_KEY)
+
+    # Session tokens (signed with SECRET_KEY)
+    TOKEN_TTL = int(os.getenv('TOKEN_TTL', str(7 * 24 * 3600)))
+    TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', '10000'))
+    TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', '300'))
+    # Revoked token ids are stored in the database and re-read this often (seconds)
+    TOKEN_REVOCATION_REFRESH = int(os.getenv('TOKEN_REVOCATION_REFRESH', '60'))
     DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
\ No newline at end of file
@@ -2,11 +2,13 @@
 from flask import Blueprint, request, jsonify
 from services.supabase_service import supabase_service
 from utils.validators import validate_email, validate_phone, hash_password, validate_password, validate_user_type
-import secrets
+from utils.auth_tokens import auth_tokens, authenticate, bearer_token, public
 
 auth_bp = Blueprint('auth', __name__)
+auth_bp.before_request(authenticate)
 
 @auth_bp.route('/register', methods=['POST'])
+@public
 def register():
     data = request.json
     email = data.get('email', '').strip()
@@ -43,14 +45,15 @@ def register():
         
         if user:
             # If user is a company, create a company entry
+            company_id = None
             if user_type == 'company':
                 try:
-                    supabase_service.create_company(user['id'], email)
+                    company = supabase_service.create_company(user['id'], email)
+                    company_id = company.data[0]['id'] if company and company.data else None
                 except Exception as e:
                     print(f"Error creating company entry: {e}")
             
-            # Generate token (simplified - in production use JWT)
-            token = secrets.token_urlsafe(32)
+            token = auth_tokens.issue(user['id'], user['user_type'], company_id)
             return jsonify({
                 'token': token,
                 'user': {
@@ -65,6 +68,7 @@ def register():
         return jsonify({'error': str(e)}), 500
 
 @auth_bp.route('/login', methods=['POST'])
+@public
 def login():
     data = request.json
     email = data.get('email', '').strip()
@@ -88,8 +92,13 @@ def login():
     if user['user_type'] != user_type:
         return jsonify({'error': 'Invalid user type'}), 401
     
-    # Generate token
-    token = secrets.token_urlsafe(32)
+    # Company users carry their company id in the token
+    company_id = None
+    if user['user_type'] == 'company':
+        company = supabase_service.get_company_by_user_id(user['id'])
+        company_id = company['id'] if company else None
+
+    token = auth_tokens.issue(user['id'], user['user_type'], company_id)
     return jsonify({
         'token': token,
         'user': {
@@ -99,3 +108,7 @@ def login():
         }
     }), 200
 
+@auth_bp.route('/logout', methods=['POST'])
+def logout():
+    auth_tokens.revoke(bearer_token())
+    return jsonify({'message': 'Logged out'}), 200
@@ -1,17 +1,24 @@
 # Bookings Routes
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, g
 from services.supabase_service import supabase_service
+from services.availability_service import availability_service
+from utils.pagination import page_args
+from utils.validators import parse_fields
+from utils.auth_tokens import authenticate
 
 bookings_bp = Blueprint('bookings', __name__)
+bookings_bp.before_request(authenticate)
+
+def owns_booking(booking_id):
+    """Whether a booking was made by the caller"""
+    booking = supabase_service.get_booking(booking_id)
+    return booking is not None and booking.get('client_id') == g.user_id
 
 @bookings_bp.route('', methods=['POST'])
 def create_booking():
     data = request.json
-    # In production, get user_id from token
-    user_id = data.get('user_id', 1)  # Temporary
-    
     booking_data = {
-        'client_id': user_id,
+        'client_id': g.user_id,
         'service_id': data.get('service_id'),
         'master_id': data.get('master_id'),
         'company_id': data.get('company_id'),
@@ -22,18 +29,22 @@ def create_booking():
     
     try:
         result = supabase_service.create_booking(booking_data)
+        for booking in result.data or []:
+            availability_service.add_booking(booking)
         return jsonify(result.data[0] if result.data else {}), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @bookings_bp.route('', methods=['GET'])
 def get_bookings():
-    user_id = request.args.get('user_id')
-    if not user_id:
-        return jsonify({'error': 'user_id required'}), 400
-    
-    bookings = supabase_service.get_user_bookings(user_id)
-    return jsonify({'bookings': bookings}), 200
+    try:
+        limit, after = page_args(request.args)
+        columns = parse_fields('bookings', request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    bookings = supabase_service.get_user_bookings(g.user_id, limit, after, columns)
+    return jsonify({'bookings': bookings, 'next_cursor': bookings.next_cursor}), 200
 
 @bookings_bp.route('/<int:booking_id>/reschedule', methods=['PUT'])
 def reschedule_booking(booking_id):
@@ -45,7 +56,10 @@ def reschedule_booking(booking_id):
     }
     
     try:
+        if not owns_booking(booking_id):
+            return jsonify({'error': 'Not your booking'}), 403
         result = supabase_service.update_booking(booking_id, update_data)
+        availability_service.move_booking(booking_id, result.data[0] if result.data else None)
         return jsonify(result.data[0] if result.data else {}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -53,7 +67,10 @@ def reschedule_booking(booking_id):
 @bookings_bp.route('/<int:booking_id>', methods=['DELETE'])
 def cancel_booking(booking_id):
     try:
+        if not owns_booking(booking_id):
+            return jsonify({'error': 'Not your booking'}), 403
         supabase_service.delete_booking(booking_id)
+        availability_service.remove_booking(booking_id)
         return jsonify({'message': 'Booking cancelled'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1,21 +1,37 @@
 # Company Routes
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, g
 from services.supabase_service import supabase_service
+from utils.pagination import page_args
+from utils.validators import parse_fields
+from utils.auth_tokens import authenticate
 
 companies_bp = Blueprint('companies', __name__)
+companies_bp.before_request(authenticate)
+
+@companies_bp.before_request
+def require_company():
+    """Company endpoints act on the company carried by the caller's token"""
+    if request.method != 'OPTIONS' and g.get('company_id') is None:
+        return jsonify({'error': 'Company account required'}), 403
+
+def owns(row):
+    """Whether a master / promotion row belongs to the caller's company"""
+    return row is not None and row.get('company_id') == g.company_id
 
 @companies_bp.route('/settings', methods=['GET'])
 def get_company_settings():
-    # In production, get from token
-    company_id = request.args.get('company_id', 1)
-    settings = supabase_service.get_company_settings(company_id)
+    company_id = g.company_id
+    try:
+        columns = parse_fields('companies', request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    settings = supabase_service.get_company_settings(company_id, columns)
     return jsonify(settings or {}), 200
 
 @companies_bp.route('/settings', methods=['PUT'])
 def update_company_settings():
     data = request.json
-    # In production, get from token
-    company_id = data.get('company_id', 1)
+    company_id = g.company_id
     
     try:
         result = supabase_service.update_company_settings(company_id, data)
@@ -25,16 +41,19 @@ def update_company_settings():
 
 @companies_bp.route('/masters', methods=['GET'])
 def get_masters():
-    # In production, get from token
-    company_id = request.args.get('company_id', 1)
-    masters = supabase_service.get_company_masters(company_id)
-    return jsonify({'masters': masters}), 200
+    company_id = g.company_id
+    try:
+        limit, after = page_args(request.args)
+        columns = parse_fields('masters', request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    masters = supabase_service.get_company_masters(company_id, limit, after, columns)
+    return jsonify({'masters': masters, 'next_cursor': masters.next_cursor}), 200
 
 @companies_bp.route('/masters', methods=['POST'])
 def create_master():
     data = request.json
-    # In production, get from token
-    company_id = data.get('company_id', 1)
+    company_id = g.company_id
     
     master_data = {
         'company_id': company_id,
@@ -51,9 +70,18 @@ def create_master():
 
 @companies_bp.route('/masters/<int:master_id>', methods=['PUT'])
 def update_master(master_id):
-    data = request.json
+    data = request.json or {}
+    master_data = {
+        'name': data.get('name'),
+        'photo': data.get('photo'),
+        'specialization': data.get('specialization')
+    }
+    # Only the editable fields: never id or company_id
+    master_data = {k: v for k, v in master_data.items() if v is not None}
     try:
-        result = supabase_service.update_master(master_id, data)
+        if not owns(supabase_service.get_master(master_id)):
+            return jsonify({'error': 'Not your master'}), 403
+        result = supabase_service.update_master(master_id, master_data)
         return jsonify(result.data[0] if result.data else {}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -61,6 +89,8 @@ def update_master(master_id):
 @companies_bp.route('/masters/<int:master_id>', methods=['DELETE'])
 def delete_master(master_id):
     try:
+        if not owns(supabase_service.get_master(master_id)):
+            return jsonify({'error': 'Not your master'}), 403
         supabase_service.delete_master(master_id)
         return jsonify({'message': 'Master deleted'}), 200
     except Exception as e:
@@ -68,16 +98,18 @@ def delete_master(master_id):
 
 @companies_bp.route('/promotions', methods=['GET'])
 def get_promotions():
-    # In production, get from token
-    company_id = request.args.get('company_id', 1)
-    result = supabase_service.get_table('promotions').select('*').eq('company_id', company_id).execute()
-    return jsonify({'promotions': result.data}), 200
+    company_id = g.company_id
+    try:
+        limit, after = page_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    promotions = supabase_service.get_company_promotions(company_id, limit, after)
+    return jsonify({'promotions': promotions, 'next_cursor': promotions.next_cursor}), 200
 
 @companies_bp.route('/promotions', methods=['POST'])
 def create_promotion():
     data = request.json
-    # In production, get from token
-    company_id = data.get('company_id', 1)
+    company_id = g.company_id
     
     promotion_data = {
         'company_id': company_id,
@@ -88,7 +120,7 @@ def create_promotion():
     }
     
     try:
-        result = supabase_service.get_table('promotions').insert(promotion_data).execute()
+        result = supabase_service.create_promotion(promotion_data)
         return jsonify(result.data[0] if result.data else {}), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -96,7 +128,9 @@ def create_promotion():
 @companies_bp.route('/promotions/<int:promotion_id>', methods=['DELETE'])
 def delete_promotion(promotion_id):
     try:
-        supabase_service.get_table('promotions').delete().eq('id', promotion_id).execute()
+        if not owns(supabase_service.get_promotion(promotion_id)):
+            return jsonify({'error': 'Not your promotion'}), 403
+        supabase_service.delete_promotion(promotion_id)
         return jsonify({'message': 'Promotion deleted'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1,9 +1,16 @@
 # Maps Routes - Using SerpApi for all map functionality
 from flask import Blueprint, request, jsonify
 from services.maps_service import maps_service
+from config import Config
 
 maps_bp = Blueprint('maps', __name__)
 
+def format_distance(distance):
+    """Human readable distance, e.g. '850 m' or '2.4 km'"""
+    if distance < 1000:
+        return f"{int(distance)} m"
+    return f"{distance/1000:.1f} km"
+
 @maps_bp.route('/search', methods=['POST'])
 def search_places():
     """Search for places"""
@@ -67,18 +74,34 @@ def calculate_distance():
     
     distance = maps_service.calculate_distance(origin, destination)
     if distance is not None:
-        # Format distance
-        if distance < 1000:
-            formatted = f"{int(distance)} m"
-        else:
-            formatted = f"{distance/1000:.1f} km"
-        
         return jsonify({
             'distance_meters': distance,
-            'distance_formatted': formatted
+            'distance_formatted': format_distance(distance)
         }), 200
     return jsonify({'error': 'Could not calculate distance'}), 400
 
+@maps_bp.route('/distance-matrix', methods=['POST'])
+def calculate_distance_matrix():
+    """Calculate distances from N origins to M destinations in one request"""
+    data = request.get_json(silent=True) or {}
+    origins = data.get('origins')  # [{lat, lng}, ...]
+    destinations = data.get('destinations')  # [{lat, lng}, ...]
+    
+    if not isinstance(origins, list) or not isinstance(destinations, list) or not origins or not destinations:
+        return jsonify({'error': 'origins and destinations must be non-empty lists'}), 400
+    if len(origins) * len(destinations) > Config.MAPS_MATRIX_MAX_CELLS:
+        return jsonify({'error': f'At most {Config.MAPS_MATRIX_MAX_CELLS} origin/destination pairs are allowed'}), 400
+    
+    matrix = maps_service.calculate_distance_matrix(origins, destinations)
+    rows = [
+        [
+            {'distance_meters': d, 'distance_formatted': format_distance(d)} if d is not None else None
+            for d in row
+        ]
+        for row in matrix
+    ]
+    return jsonify({'rows': rows}), 200
+
 @maps_bp.route('/directions', methods=['POST'])
 def get_directions():
     """Get directions between two points"""
@@ -99,6 +122,7 @@ def maps_status():
     """Check if maps service is available"""
     return jsonify({
         'available': maps_service.client is not None,
-        'provider': 'SerpApi'
+        'provider': 'SerpApi',
+        'cache': maps_service.cache_stats()
     }), 200
 
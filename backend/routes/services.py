@@ -1,12 +1,28 @@
 # Services Routes
-from flask import Blueprint, request, jsonify
+from datetime import date
+from flask import Blueprint, request, jsonify, Response, stream_with_context, g
 from services.supabase_service import supabase_service
-from services.openai_service import openai_service
-from services.maps_service import maps_service
+from services.availability_service import availability_service
+from services.search_service import search_service
+from utils.validators import parse_int, parse_fields
+from utils.pagination import page_args
+from utils.concurrency import run_concurrently
+from utils.streaming import sse_event, ndjson_line
+from utils.auth_tokens import authenticate, public
+from config import Config
 
 services_bp = Blueprint('services', __name__)
+services_bp.before_request(authenticate)
+
+def owns_service(service_id):
+    """Whether the caller's company owns a service (unknown services are denied)"""
+    if g.company_id is None:
+        return False
+    service = supabase_service.get_service(service_id, 'id,company_id')
+    return service is not None and service.get('company_id') == g.company_id
 
 @services_bp.route('/search', methods=['POST'])
+@public
 def search_services():
     try:
         data = request.get_json(silent=True) or {}
@@ -18,66 +34,79 @@ def search_services():
             'rating': data.get('rating', ''),
             'distance': data.get('distance', ''),
         }
+        limit = parse_int(data.get('limit'), Config.SEARCH_DEFAULT_LIMIT, 1, Config.SEARCH_MAX_LIMIT)
+        offset = parse_int(data.get('offset'), 0, 0)
+
+        stream_format = search_stream_format(data)
+        if stream_format:
+            return stream_search(stream_format, query, filters, limit, offset, user_location, data.get('sort'))
         
-        all_services = []
-        
-        # First, search in our database
-        try:
-            db_services = supabase_service.search_services(query, filters)
-            if db_services:
-                all_services.extend(db_services)
-        except Exception as e:
-            print(f"Supabase search error: {e}")
-        
-        # If no results in database, try to search Google Maps (if available)
-        if len(all_services) == 0 and query:
-            # Check if maps service is available
-            if maps_service and maps_service.client:
-                try:
-                    # Use OpenAI to generate Google Maps search filters if available
-                    maps_filters = None
-                    if openai_service and openai_service.client:
-                        maps_filters = openai_service.generate_google_maps_filters(query)
-                    
-                    search_keyword = query
-                    place_type = None
-                    
-                    if maps_filters:
-                        search_keyword = maps_filters.get('keyword', query)
-                        place_type = maps_filters.get('type')
-                    
-                    # Search Google Maps
-                    google_results = maps_service.search_places(
-                        query=search_keyword,
-                        location=user_location,
-                        radius=10000,  # 10km radius
-                        type=place_type
-                    )
-                    
-                    # Convert Google Maps results to service format
-                    for place in google_results:
-                        all_services.append({
-                            'id': f"google_{place.get('place_id', '')}",
-                            'name': place.get('name', ''),
-                            'company': place.get('name', ''),
-                            'address': place.get('address', ''),
-                            'rating': place.get('rating', 0),
-                            'category': place_type or 'other',
-                            'price': 0,  # Price not available from Google Maps
-                            'image': place.get('thumbnail'),
-                            'description': 'Found via Google Maps',
-                            'location': place.get('location', {}),
-                            'source': 'google_maps'
-                        })
-                except Exception as e:
-                    print(f"Google Maps search error: {e}")
+        # Database first (ranked, only the requested page), Google Maps if nothing matches
+        result = search_service.search(
+            query, filters, limit, offset,
+            user_location=user_location,
+            sort=data.get('sort'),
+            pipelined=data.get('pipelined')
+        )
         
-        return jsonify({'services': all_services}), 200
+        return jsonify({
+            'services': result['services'],
+            'total': result['total'],
+            'limit': limit,
+            'offset': offset,
+            'timed_out': result['timed_out']
+        }), 200
     except Exception as e:
         print(f"Search services error: {e}")
         return jsonify({'error': str(e), 'services': []}), 500
 
+def search_stream_format(data):
+    """'sse' / 'ndjson' when the client opted into a streamed search response, else None"""
+    requested = str(data.get('stream') or '').lower()
+    if requested in ('sse', 'ndjson'):
+        return requested
+    accept = request.headers.get('Accept', '')
+    if 'text/event-stream' in accept:
+        return 'sse'
+    if 'application/x-ndjson' in accept:
+        return 'ndjson'
+    return None
+
+def stream_search(stream_format, query, filters, limit, offset, user_location, sort):
+    """
+    Stream search results as they become available: one 'service' record per
+    result (database hits first, Google Maps fallback after) and a final
+    'summary' record.
+    """
+    if stream_format == 'sse':
+        emit, mimetype = sse_event, 'text/event-stream'
+    else:
+        emit, mimetype = (lambda event, data: ndjson_line({'type': event, **data})), 'application/x-ndjson'
+
+    def generate():
+        try:
+            for stage, result in search_service.search_stages(query, filters, limit, offset, user_location, sort):
+                if stage == 'done':
+                    yield emit('summary', {**result, 'limit': limit, 'offset': offset})
+                    continue
+                yield emit('page', {'source': result['source'], 'total': result['total']})
+                for service in result['services']:
+                    yield emit('service', {'source': result['source'], 'service': service})
+        except Exception as e:
+            print(f"Search services error: {e}")
+            yield emit('error', {'error': str(e)})
+
+    return Response(stream_with_context(generate()), mimetype=mimetype,
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@services_bp.route('/search/stats', methods=['GET'])
+@public
+def search_stats():
+    """How often searches were classified locally vs. by OpenAI"""
+    return jsonify(search_service.stats()), 200
+
 @services_bp.route('/<service_id>', methods=['GET'])
+@public
 def get_service(service_id):
     # Handle Google Maps service IDs (string starting with "google_")
     if isinstance(service_id, str) and service_id.startswith('google_'):
@@ -98,45 +127,118 @@ def get_service(service_id):
     except (ValueError, TypeError):
         return jsonify({'error': 'Invalid service ID'}), 400
     
-    service = supabase_service.get_service(service_id)
+    try:
+        columns = parse_fields('services', request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    service = supabase_service.get_service(service_id, columns)
     if not service:
         return jsonify({'error': 'Service not found'}), 404
     return jsonify(service), 200
 
 @services_bp.route('/<int:service_id>/masters', methods=['GET'])
+@public
 def get_service_masters(service_id):
-    masters = supabase_service.get_service_masters(service_id)
+    try:
+        columns = parse_fields('masters', request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    masters = supabase_service.get_service_masters(service_id, columns)
     return jsonify({'masters': masters}), 200
 
 @services_bp.route('/<int:service_id>/reviews', methods=['GET'])
+@public
 def get_service_reviews(service_id):
-    reviews = supabase_service.get_service_reviews(service_id)
-    return jsonify({'reviews': reviews}), 200
+    try:
+        limit, after = page_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    reviews = supabase_service.get_service_reviews(service_id, limit, after)
+    return jsonify({'reviews': reviews, 'next_cursor': reviews.next_cursor}), 200
 
 @services_bp.route('/<int:service_id>/examples', methods=['GET'])
+@public
 def get_service_examples(service_id):
     examples = supabase_service.get_service_examples(service_id)
     return jsonify({'examples': examples}), 200
 
+def parse_date(value):
+    """Parse a 'YYYY-MM-DD' request parameter, or return None"""
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+def available_time_slots(service_id, master_id=None, day=None):
+    """Free start times for a single day (today if not given)"""
+    day = day or date.today()
+    availability = availability_service.get_available_slots(service_id, master_id, day, day)
+    return availability.get(day.isoformat(), [])
+
 @services_bp.route('/<int:service_id>/time-slots', methods=['GET'])
+@public
 def get_time_slots(service_id):
     master_id = request.args.get('master_id')
-    date = request.args.get('date')
+    day = parse_date(request.args.get('date'))
+    date_from = parse_date(request.args.get('date_from'))
+    date_to = parse_date(request.args.get('date_to'))
     
-    # Generate time slots (simplified - in production check actual availability)
-    time_slots = []
-    for hour in range(9, 18):
-        time_slots.append(f"{hour:02d}:00")
+    try:
+        # Range query: availability for several days at once
+        if date_from or date_to:
+            date_from = date_from or date.today()
+            date_to = date_to or date_from
+            if date_to < date_from or (date_to - date_from).days >= Config.AVAILABILITY_MAX_DAYS:
+                return jsonify({'error': f'Date range must be 1 to {Config.AVAILABILITY_MAX_DAYS} days'}), 400
+            availability = availability_service.get_available_slots(service_id, master_id, date_from, date_to)
+            return jsonify({'availability': availability}), 200
+        
+        time_slots = available_time_slots(service_id, master_id, day)
+        return jsonify({'time_slots': time_slots}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@services_bp.route('/<int:service_id>/full', methods=['GET'])
+@public
+def get_service_full(service_id):
+    """Service details, masters, reviews, examples and time slots in one response"""
+    master_id = request.args.get('master_id')
+    day = parse_date(request.args.get('date'))
+    
+    # Independent lookups run concurrently; a failed section doesn't fail the page
+    results, errors = run_concurrently({
+        'service': lambda: supabase_service.get_service(service_id),
+        'masters': lambda: supabase_service.get_service_masters(service_id),
+        'reviews': lambda: supabase_service.get_service_reviews(service_id),
+        'examples': lambda: supabase_service.get_service_examples(service_id),
+        'time_slots': lambda: available_time_slots(service_id, master_id, day),
+    }, timeout=Config.FANOUT_TIMEOUT)
     
-    return jsonify({'time_slots': time_slots}), 200
+    if 'service' not in errors and not results.get('service'):
+        return jsonify({'error': 'Service not found'}), 404
+    
+    return jsonify({
+        'service': results.get('service'),
+        'masters': results.get('masters', []),
+        'reviews': results.get('reviews', []),
+        'examples': results.get('examples', []),
+        'time_slots': results.get('time_slots', []),
+        'errors': errors
+    }), 200
 
 # Company service management endpoints
 @services_bp.route('/company/<int:company_id>', methods=['GET'])
+@public
 def get_company_services(company_id):
-    """Get all services for a company"""
+    """Get a page of a company's services"""
+    try:
+        limit, after = page_args(request.args)
+        columns = parse_fields('services', request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     try:
-        services = supabase_service.get_company_services(company_id)
-        return jsonify({'services': services}), 200
+        services = supabase_service.get_company_services(company_id, limit, after, columns)
+        return jsonify({'services': services, 'next_cursor': services.next_cursor}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -145,10 +247,10 @@ def create_service():
     """Create a new service (for companies)"""
     try:
         data = request.get_json()
-        company_id = data.get('company_id')
+        company_id = g.company_id
         
         if not company_id:
-            return jsonify({'error': 'Company ID is required'}), 400
+            return jsonify({'error': 'Company account required'}), 403
         
         service_data = {
             'company_id': company_id,
@@ -170,6 +272,8 @@ def create_service():
 @services_bp.route('/<int:service_id>', methods=['PUT'])
 def update_service(service_id):
     """Update a service"""
+    if not owns_service(service_id):
+        return jsonify({'error': 'Not your service'}), 403
     try:
         data = request.get_json()
         service_data = {
@@ -193,6 +297,8 @@ def update_service(service_id):
 @services_bp.route('/<int:service_id>', methods=['DELETE'])
 def delete_service(service_id):
     """Delete a service"""
+    if not owns_service(service_id):
+        return jsonify({'error': 'Not your service'}), 403
     try:
         result = supabase_service.delete_service(service_id)
         if result:
@@ -0,0 +1,180 @@
+# Availability Service
+import threading
+from datetime import date as date_type, datetime, timedelta
+
+from config import Config
+from services.supabase_service import supabase_service
+from utils.invalidation import invalidation_bus
+
+
+def _parse_minutes(value):
+    """'HH:MM' or 'HH:MM:SS' -> minutes since midnight"""
+    parts = str(value).split(':')
+    return int(parts[0]) * 60 + int(parts[1])
+
+
+class AvailabilityService:
+    """
+    Per-master, per-day occupancy kept as integer bitmaps (one bit per slot).
+
+    A master's bookings are loaded once on first use and then kept current
+    by add_booking / move_booking / remove_booking, so slot lookups are a
+    handful of bit operations instead of a scan over bookings.
+    """
+
+    def __init__(self):
+        self.slot_minutes = Config.AVAILABILITY_SLOT_MINUTES
+        self.day_start = _parse_minutes(Config.WORK_DAY_START)
+        self.day_end = _parse_minutes(Config.WORK_DAY_END)
+        self.slots_per_day = (self.day_end - self.day_start) // self.slot_minutes
+        self.day_mask = (1 << self.slots_per_day) - 1
+        self._lock = threading.RLock()
+        self._occupied = {}  # (master_id, 'YYYY-MM-DD') -> bitmap
+        self._day_bookings = {}  # (master_id, 'YYYY-MM-DD') -> {booking id: bitmap}
+        self._bookings = {}  # booking id -> (master_id, 'YYYY-MM-DD')
+        self._loaded = set()  # master ids whose bookings are loaded
+        invalidation_bus.subscribe('bookings', self._on_bookings_invalidated)
+
+    def _booking_bits(self, booking):
+        """Bitmap of slots covered by a booking, or None if it can't be placed"""
+        if booking.get('status') == 'cancelled' or not booking.get('date') or not booking.get('time'):
+            return None
+        try:
+            start = _parse_minutes(booking['time'])
+        except (TypeError, ValueError, IndexError):
+            return None
+        duration = supabase_service.get_service_duration(booking.get('service_id'))
+        first = max((start - self.day_start) // self.slot_minutes, 0)
+        last = min(-(-(start + duration - self.day_start) // self.slot_minutes), self.slots_per_day)
+        if last <= first:
+            return None
+        return ((1 << (last - first)) - 1) << first
+
+    def _key(self, master_id):
+        return str(master_id)
+
+    def _ensure_loaded(self, master_id):
+        key = self._key(master_id)
+        if key in self._loaded:
+            return
+        bookings = supabase_service.get_master_bookings(master_id, date_type.today().isoformat())
+        with self._lock:
+            if key in self._loaded:
+                return
+            for booking in bookings:
+                self._place(booking)
+            self._loaded.add(key)
+
+    def _place(self, booking):
+        bits = self._booking_bits(booking)
+        if bits is None or booking.get('id') is None:
+            return
+        key = (self._key(booking.get('master_id')), str(booking['date']))
+        self._bookings[booking['id']] = key
+        self._day_bookings.setdefault(key, {})[booking['id']] = bits
+        self._occupied[key] = self._occupied.get(key, 0) | bits
+
+    def _unplace(self, booking_id):
+        key = self._bookings.pop(booking_id, None)
+        if not key:
+            return
+        day_bookings = self._day_bookings.get(key, {})
+        day_bookings.pop(booking_id, None)
+        # Rebuild the day from its remaining bookings in case slots overlapped
+        occupied = 0
+        for bits in day_bookings.values():
+            occupied |= bits
+        if occupied:
+            self._occupied[key] = occupied
+        else:
+            self._occupied.pop(key, None)
+            self._day_bookings.pop(key, None)
+
+    # Incremental updates from the booking routes
+    def add_booking(self, booking):
+        with self._lock:
+            if self._key(booking.get('master_id')) in self._loaded:
+                self._place(booking)
+        invalidation_bus.publish('bookings', [booking.get('id')])
+
+    def move_booking(self, booking_id, booking):
+        with self._lock:
+            self._unplace(booking_id)
+            if booking and self._key(booking.get('master_id')) in self._loaded:
+                self._place({**booking, 'id': booking_id})
+        invalidation_bus.publish('bookings', [booking_id])
+
+    def remove_booking(self, booking_id):
+        with self._lock:
+            self._unplace(booking_id)
+        invalidation_bus.publish('bookings', [booking_id])
+
+    def _on_bookings_invalidated(self, booking_ids):
+        """Bookings changed by another worker: re-read them (deleted ones are simply gone)"""
+        bookings = supabase_service.get_bookings(booking_ids)
+        with self._lock:
+            for booking_id in booking_ids:
+                self._unplace(booking_id)
+            for booking in bookings:
+                if self._key(booking.get('master_id')) in self._loaded:
+                    self._place(booking)
+
+    def _free_starts(self, occupied, duration, day):
+        """Bitmap of slot starts where `duration` minutes fit in free time"""
+        free = ~occupied & self.day_mask
+        available = free
+        for shift in range(1, -(-duration // self.slot_minutes)):
+            available &= free >> shift
+        if day == date_type.today():
+            now = datetime.now()
+            passed = -(-(now.hour * 60 + now.minute - self.day_start) // self.slot_minutes)
+            if passed > 0:
+                available &= ~((1 << passed) - 1)
+        return available
+
+    def _slots(self, bitmap):
+        slots = []
+        while bitmap:
+            low = bitmap & -bitmap
+            minutes = self.day_start + (low.bit_length() - 1) * self.slot_minutes
+            slots.append(f"{minutes // 60:02d}:{minutes % 60:02d}")
+            bitmap ^= low
+        return slots
+
+    def get_available_slots(self, service_id, master_id=None, date_from=None, date_to=None):
+        """
+        Available start times per day for a service.
+
+        Without master_id a slot is available if any master of the service
+        is free. Returns {'YYYY-MM-DD': ['HH:MM', ...]} for date_from..date_to.
+        """
+        date_from = date_from or date_type.today()
+        date_to = date_to or date_from
+        duration = supabase_service.get_service_duration(service_id)
+
+        if master_id:
+            masters = [master_id]
+        else:
+            masters = [m['id'] for m in supabase_service.get_service_masters(service_id) or []]
+        for master in masters:
+            self._ensure_loaded(master)
+
+        result = {}
+        day = date_from
+        with self._lock:
+            while day <= date_to:
+                key = day.isoformat()
+                if masters:
+                    available = 0
+                    for master in masters:
+                        occupied = self._occupied.get((self._key(master), key), 0)
+                        available |= self._free_starts(occupied, duration, day)
+                else:
+                    # No masters configured: only the working day applies
+                    available = self._free_starts(0, duration, day)
+                result[key] = self._slots(available)
+                day += timedelta(days=1)
+        return result
+
+# Create global instance
+availability_service = AvailabilityService()
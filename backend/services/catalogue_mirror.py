@@ -0,0 +1,251 @@
+# In-memory read replica of the catalogue tables
+import os
+import threading
+import time
+from collections import defaultdict
+
+from config import Config
+from utils.pagination import Page, encode_cursor
+
+# Table -> columns reads filter on (kept as secondary indexes)
+MIRROR_TABLES = {
+    'services': ('company_id',),
+    'masters': ('company_id', 'service_id'),
+    'companies': ('user_id',),
+    'work_examples': ('service_id',),
+    'promotions': ('company_id',),
+}
+
+# Rows fetched per request while syncing
+SYNC_PAGE_SIZE = 1000
+
+
+def _project(row, columns):
+    """Apply a select() column list ('*' or 'id,name,...') to a mirrored row"""
+    if columns in (None, '', '*'):
+        return dict(row)
+    return {c: row.get(c) for c in (c.strip() for c in columns.split(','))}
+
+
+class CatalogueMirror:
+    """
+    Read-mostly tables held in memory. A background thread applies changes
+    incrementally (rows with updated_at >= the last one seen) every
+    MIRROR_SYNC_INTERVAL seconds and reloads everything every
+    MIRROR_FULL_SYNC_INTERVAL to pick up deletes made elsewhere. Writes
+    through SupabaseService are applied right away. Reads fall back to the
+    database when a table is older than MIRROR_MAX_STALENESS.
+    """
+
+    def __init__(self, get_table, tables=None):
+        self.get_table = get_table
+        self.tables = tables or MIRROR_TABLES
+        self._lock = threading.RLock()
+        self.rows = {t: {} for t in self.tables}
+        self.by_column = {t: {c: defaultdict(set) for c in cols} for t, cols in self.tables.items()}
+        self.watermarks = {}  # table -> max updated_at seen
+        self.synced_at = {}  # table -> time of last successful sync
+        self.full_synced_at = {}
+        self.delta_supported = {}  # table -> False when it has no updated_at column
+        self._reloading = {}  # table -> {row id: row or None} local writes made during a full reload
+        self._thread = None
+        self._stop = threading.Event()
+
+    # Local changes
+    def upsert(self, table, row):
+        if table not in self.tables or not row or row.get('id') is None:
+            return
+        with self._lock:
+            self._upsert_locked(table, row)
+            if table in self._reloading:
+                self._reloading[table][row['id']] = row
+
+    def _upsert_locked(self, table, row):
+        self._remove_locked(table, row['id'])
+        self.rows[table][row['id']] = row
+        for column, index in self.by_column[table].items():
+            index[row.get(column)].add(row['id'])
+
+    def remove(self, table, row_id):
+        if table not in self.tables:
+            return
+        with self._lock:
+            self._remove_locked(table, row_id)
+            if table in self._reloading:
+                self._reloading[table][row_id] = None
+
+    def _remove_locked(self, table, row_id):
+        old = self.rows[table].pop(row_id, None)
+        if old is None:
+            return
+        for column, index in self.by_column[table].items():
+            ids = index.get(old.get(column))
+            if ids is not None:
+                ids.discard(row_id)
+                if not ids:
+                    del index[old.get(column)]
+
+    # Sync
+    def _fetch(self, table, since=None):
+        query_table = self.get_table(table)
+        rows = []
+        start = 0
+        while True:
+            query = query_table.select('*')
+            if since is not None:
+                query = query.gte('updated_at', since).order('updated_at')
+            else:
+                query = query.order('id')
+            page = query.range(start, start + SYNC_PAGE_SIZE - 1).execute().data or []
+            rows.extend(page)
+            if len(page) < SYNC_PAGE_SIZE:
+                return rows
+            start += SYNC_PAGE_SIZE
+            query_table = self.get_table(table)
+
+    def sync_table(self, table, full=False):
+        """Bring one table up to date; returns the number of rows applied"""
+        started = time.time()
+        since = self.watermarks.get(table)
+        full = full or table not in self.full_synced_at
+        if not full and (since is None or not self.delta_supported.get(table, True)):
+            # Nothing to diff against (no updated_at values): rely on the
+            # invalidation bus and the periodic full reload
+            rows = []
+        elif not full:
+            try:
+                rows = self._fetch(table, since)
+            except Exception as e:
+                # No updated_at column: only full reloads work for this table
+                print(f"Warning: delta sync unavailable for {table}: {e}")
+                self.delta_supported[table] = False
+                full = True
+        if full:
+            rows = self._reload(table)
+            self.full_synced_at[table] = started
+        else:
+            for row in rows:
+                self.upsert(table, row)
+        # Only rows read back from the database move the watermark: a local
+        # write must not skip older changes made by other workers
+        stamps = [row['updated_at'] for row in rows if row.get('updated_at')]
+        if stamps:
+            self.watermarks[table] = max(stamps + [self.watermarks.get(table, '')])
+        self.synced_at[table] = started
+        return len(rows)
+
+    def _reload(self, table):
+        """
+        Replace a table with a fresh copy. The copy is built off to the side
+        and swapped in at once, so readers never see it half loaded; local
+        writes made while it was fetched are applied on top. Returns the
+        fetched rows.
+        """
+        with self._lock:
+            self._reloading[table] = {}
+        try:
+            fetched = self._fetch(table)
+        except Exception:
+            with self._lock:
+                self._reloading.pop(table, None)
+            raise
+        rows = {row['id']: row for row in fetched if row.get('id') is not None}
+        by_column = {c: defaultdict(set) for c in self.tables[table]}
+        for row in rows.values():
+            for column, index in by_column.items():
+                index[row.get(column)].add(row['id'])
+        with self._lock:
+            writes = self._reloading.pop(table)
+            self.rows[table] = rows
+            self.by_column[table] = by_column
+            self.watermarks.pop(table, None)
+            for row_id, row in writes.items():
+                current = rows.get(row_id)
+                if row is None:
+                    self._remove_locked(table, row_id)
+                elif current is None or (row.get('updated_at') or '') >= (current.get('updated_at') or ''):
+                    self._upsert_locked(table, row)
+        return fetched
+
+    def sync(self):
+        for table in self.tables:
+            full = time.time() - self.full_synced_at.get(table, 0) >= Config.MIRROR_FULL_SYNC_INTERVAL
+            try:
+                self.sync_table(table, full=full)
+            except Exception as e:
+                print(f"Warning: Could not sync {table} mirror: {e}")
+
+    def start(self):
+        """Load every table once, then keep syncing in a daemon thread"""
+        if self._thread:
+            return
+        self.sync()
+        self._start_thread()
+        # gunicorn --preload forks after import: threads don't survive the fork
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _start_thread(self):
+        self._thread = threading.Thread(target=self._run, name='catalogue-mirror', daemon=True)
+        self._thread.start()
+
+    def _after_fork(self):
+        # The child keeps the parent's rows; only the sync thread and locks need replacing
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._reloading = {}
+        self._start_thread()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(Config.MIRROR_SYNC_INTERVAL):
+            self.sync()
+
+    # Reads
+    def fresh(self, table):
+        """Whether reads of this table may be served from memory"""
+        synced_at = self.synced_at.get(table)
+        return synced_at is not None and time.time() - synced_at <= Config.MIRROR_MAX_STALENESS
+
+    def get(self, table, row_id, columns='*'):
+        try:
+            row_id = int(row_id)
+        except (TypeError, ValueError):
+            pass
+        row = self.rows[table].get(row_id)
+        return _project(row, columns) if row else None
+
+    def find(self, table, column, value, columns='*'):
+        """Rows where column == value, ordered by id"""
+        if column == 'id':
+            row = self.get(table, value, columns)
+            return [row] if row else []
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            pass
+        with self._lock:
+            ids = sorted(self.by_column[table][column].get(value, ()))
+            rows = [self.rows[table][i] for i in ids]
+        return [_project(row, columns) for row in rows]
+
+    def page(self, table, column, value, limit=None, after=None, columns='*'):
+        """Keyset page, same contract as SupabaseService._keyset_page"""
+        limit = limit or Config.PAGE_DEFAULT_LIMIT
+        rows = self.find(table, column, value)
+        if after is not None:
+            rows = [row for row in rows if row['id'] > after]
+        next_cursor = encode_cursor(rows[limit - 1]['id']) if len(rows) > limit else None
+        return Page([_project(row, columns) for row in rows[:limit]], next_cursor)
+
+    def stats(self):
+        now = time.time()
+        return {
+            table: {
+                'rows': len(self.rows[table]),
+                'age': round(now - self.synced_at[table], 1) if table in self.synced_at else None,
+                'delta_sync': self.delta_supported.get(table, True),
+            }
+            for table in self.tables
+        }
@@ -0,0 +1,198 @@
+# Local query-intent classifier
+import difflib
+import heapq
+import threading
+from collections import Counter, defaultdict
+
+from services.search_index import tokenize
+
+# Google Maps business type -> keywords and word stems (en / ru / uk)
+CATEGORY_KEYWORDS = {
+    'hair salon': ['haircut', 'hair', 'hairdresser', 'hairstylist', 'stylist', 'coloring', 'highlights',
+                   'стрижк', 'парикмах', 'окрашиван', 'волос', 'зачіск', 'перукар', 'фарбуван'],
+    'barber shop': ['barber', 'barbershop', 'beard', 'shave', 'барбер', 'бород', 'бритьё', 'гоління'],
+    'nail salon': ['nail', 'nails', 'manicure', 'pedicure', 'маникюр', 'педикюр', 'ногт', 'манікюр', 'нігт'],
+    'beauty salon': ['beauty', 'cosmetologist', 'facial', 'eyebrow', 'lashes', 'makeup', 'waxing',
+                     'космет', 'бров', 'ресниц', 'макияж', 'эпиляц', 'вій', 'макіяж', 'епіляц', 'краса'],
+    'massage': ['massage', 'masseur', 'spa', 'массаж', 'масаж', 'спа'],
+    'dentist': ['dentist', 'dental', 'teeth', 'tooth', 'стоматолог', 'зуб'],
+    'doctor': ['doctor', 'clinic', 'physician', 'therapist', 'врач', 'клиник', 'лікар', 'клінік'],
+    'physiotherapist': ['physiotherapy', 'physiotherapist', 'rehab', 'физиотерап', 'реабилит', 'фізіотерап'],
+    'car repair': ['mechanic', 'garage', 'tire', 'tyre', 'autoservice', 'автосервис', 'шиномонтаж', 'автомех',
+                   'автосервіс', 'ремонт авто'],
+    'car wash': ['carwash', 'wash car', 'автомойк', 'мойка', 'автомийк'],
+    'cleaning service': ['cleaning', 'cleaner', 'housekeeping', 'maid', 'уборк', 'клининг', 'прибиран'],
+    'plumber': ['plumber', 'plumbing', 'pipe', 'leak', 'сантехн', 'труб', 'протечк'],
+    'electrician': ['electrician', 'electrical', 'wiring', 'электрик', 'проводк', 'електрик'],
+    'locksmith': ['locksmith', 'lock', 'keys', 'слесар', 'замок', 'ключ', 'замк'],
+    'phone repair': ['phone', 'smartphone', 'iphone', 'screen', 'телефон', 'смартфон', 'экран', 'екран'],
+    'computer repair': ['computer', 'laptop', 'pc', 'компьютер', 'ноутбук', "комп'ютер"],
+    'appliance repair': ['appliance', 'fridge', 'washing machine', 'dishwasher', 'холодильник',
+                         'стиральн', 'пральн', 'посудомо'],
+    'tailor': ['tailor', 'alterations', 'sewing', 'ателье', 'портн', 'пошив', 'кравец', 'ательє'],
+    'dry cleaning': ['dry cleaning', 'drycleaner', 'laundry', 'химчистк', 'прачечн', 'хімчистк', 'пральня'],
+    'shoe repair': ['shoe', 'shoes', 'cobbler', 'обув', 'взутт'],
+    'gym': ['gym', 'fitness', 'workout', 'trainer', 'спортзал', 'фитнес', 'тренер', 'фітнес'],
+    'yoga studio': ['yoga', 'pilates', 'йог', 'пилатес', 'пілатес'],
+    'tattoo shop': ['tattoo', 'piercing', 'тату', 'пирсинг', 'пірсинг'],
+    'pet groomer': ['grooming', 'groomer', 'груминг', 'стрижка собак', 'грумінг'],
+    'veterinarian': ['vet', 'veterinarian', 'veterinary', 'ветеринар', 'ветклиник', 'ветклінік'],
+    'photographer': ['photographer', 'photoshoot', 'photo', 'фотограф', 'фотосесси', 'фотосесі'],
+    'moving company': ['movers', 'moving', 'relocation', 'переезд', 'грузчик', 'переїзд', 'вантажник'],
+    'tutor': ['tutor', 'tutoring', 'lessons', 'репетитор', 'уроки'],
+    'driving school': ['driving', 'автошкол', 'вождени', 'водінн'],
+}
+
+# Words that carry no intent ("near me", "best", ...)
+STOPWORDS = {
+    'near', 'me', 'nearby', 'best', 'cheap', 'good', 'the', 'a', 'an', 'in', 'for', 'and', 'to', 'my',
+    'рядом', 'около', 'недорого', 'лучший', 'хороший', 'в', 'на', 'для', 'и', 'мне', 'поруч', 'біля',
+    'найкращий', 'дешево', 'і', 'у',
+}
+
+# Shortest stem that may match by prefix (shorter ones must match exactly)
+MIN_STEM = 4
+FUZZY_CUTOFF = 0.8
+# Terms sharing the most trigrams with a query token that get a full similarity check
+FUZZY_CANDIDATES = 8
+
+
+def _grams(term):
+    """Trigrams of a term padded at both ends, so short words get some too"""
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _Vocabulary:
+    """Read-only view of the terms used by classify(); train() replaces it wholesale"""
+
+    def __init__(self, terms):
+        self.terms = terms  # term -> {category: weight}
+        self.phrases = [term for term in sorted(terms) if ' ' in term]
+        self.gram_postings = defaultdict(list)  # trigram -> terms containing it
+        for term in terms:
+            for gram in _grams(term):
+                self.gram_postings[gram].append(term)
+
+    def close_matches(self, token, n=2, cutoff=FUZZY_CUTOFF):
+        """Like difflib.get_close_matches, but only scores terms sharing the most trigrams"""
+        shared = Counter()
+        for gram in _grams(token):
+            shared.update(self.gram_postings.get(gram, ()))
+        scored = []
+        matcher = difflib.SequenceMatcher()
+        matcher.set_seq2(token)
+        for term, _ in shared.most_common(FUZZY_CANDIDATES):
+            matcher.set_seq1(term)
+            # Cheap upper bounds first, as get_close_matches does
+            if matcher.real_quick_ratio() >= cutoff and matcher.quick_ratio() >= cutoff:
+                ratio = matcher.ratio()
+                if ratio >= cutoff:
+                    scored.append((ratio, term))
+        return heapq.nlargest(n, scored)
+
+
+class IntentClassifier:
+    """
+    Maps search queries to a Google Maps business type and keyword without an
+    LLM call: exact keyword hits, stem prefixes and fuzzy (typo-tolerant)
+    matches against a synonym table, plus token -> category weights learned
+    from our own services catalogue. classify() reads an immutable snapshot
+    of the vocabulary and never takes the lock.
+    """
+
+    def __init__(self, categories=None):
+        self._lock = threading.Lock()  # serialises train()
+        terms = defaultdict(dict)  # term -> {category: weight}
+        for category, words in (categories or CATEGORY_KEYWORDS).items():
+            for word in words:
+                terms[word.lower()][category] = 1.0
+        self._vocabulary = _Vocabulary(dict(terms))
+        self.trained = False
+        self.stats = Counter()
+
+    def train(self, rows):
+        """Learn token -> category weights from service rows (name, description, category)"""
+        by_token = defaultdict(Counter)
+        for row in rows:
+            category = row.get('category')
+            if not category or category == 'other':
+                continue
+            for token in set(tokenize(row.get('name')) + tokenize(category)):
+                if token not in STOPWORDS and len(token) > 2:
+                    by_token[token][category] += 1
+
+        with self._lock:
+            terms = {term: dict(weights) for term, weights in self._vocabulary.terms.items()}
+            for token, counts in by_token.items():
+                total = sum(counts.values())
+                category, count = counts.most_common(1)[0]
+                # Only keep tokens that point clearly at one category
+                if total >= 2 and count / total >= 0.6:
+                    terms.setdefault(token, {}).setdefault(category, count / total)
+            self._vocabulary = _Vocabulary(terms)
+            self.trained = True
+
+    @property
+    def terms(self):
+        return self._vocabulary.terms
+
+    def _term_matches(self, vocabulary, token):
+        """Yield (term, similarity) for vocabulary terms matching a query token"""
+        if token in vocabulary.terms:
+            yield token, 1.0
+            return
+        # Stem match: the longest known stem the token starts with
+        for length in range(len(token) - 1, MIN_STEM - 1, -1):
+            if token[:length] in vocabulary.terms:
+                yield token[:length], 0.9
+                return
+        for ratio, term in vocabulary.close_matches(token):
+            yield term, ratio * 0.9
+
+    def classify(self, query):
+        """
+        Returns:
+            (filters, confidence): filters is {'type', 'keyword'} like the
+            OpenAI filters, or None when nothing matched; confidence is 0..1
+        """
+        text = ' '.join(str(query or '').lower().split())
+        tokens = [t for t in tokenize(text) if t not in STOPWORDS]
+        if not tokens:
+            return None, 0.0
+
+        vocabulary = self._vocabulary
+        scores = Counter()
+        explained = set()
+        # Multi-word phrases ("washing machine") match on the raw text
+        for phrase in vocabulary.phrases:
+            if phrase in text:
+                explained.update(phrase.split())
+                for category, weight in vocabulary.terms[phrase].items():
+                    scores[category] += weight
+        for token in tokens:
+            if token in explained:
+                continue
+            best = {}
+            for term, similarity in self._term_matches(vocabulary, token):
+                for category, weight in vocabulary.terms[term].items():
+                    best[category] = max(best.get(category, 0), similarity * weight)
+            if best:
+                explained.add(token)
+                scores.update(best)
+
+        if not scores:
+            return None, 0.0
+        ranked = scores.most_common(2)
+        category, score = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        # Share of query tokens explained, scaled down when categories compete
+        coverage = sum(1 for t in tokens if t in explained) / len(tokens)
+        confidence = coverage * min(score, 1.0) * score / (score + runner_up)
+        return {'type': category, 'keyword': ' '.join(tokens)}, confidence
+
+    def stats_snapshot(self):
+        return dict(self.stats)
+
+# Create global instance
+intent_classifier = IntentClassifier()
@@ -1,25 +1,68 @@
-from config import Config
+import math
 
-# Try to import SerpApi, but don't fail if not installed
-GoogleSearch = None  # type: ignore
-SERPAPI_AVAILABLE = False
+from config import Config
+from utils.cache import TieredCache, NEGATIVE
+from utils.http_client import get_provider
+from utils.geo import (
+    geohash_encode, geohash_center, geohash_neighbours, parse_location, haversine, haversine_matrix
+)
 
-try:
-    from serpapi import GoogleSearch
-    SERPAPI_AVAILABLE = True
-except ImportError:
-    print("Warning: serpapi not installed. Install with: pip install google-search-results")
+SERPAPI_URL = "https://serpapi.com/search.json"
 
 class MapsService:
     def __init__(self):
         self.api_key = Config.GOOGLE_MAPS_API_KEY
         # 'client' property for compatibility checks in routes
-        self.client = True if self.api_key and SERPAPI_AVAILABLE else None
+        self.client = True if self.api_key else None
+        # Pooled keep-alive session with retries and circuit breaking
+        self.http = get_provider('serpapi')
         
         if not self.api_key:
             print("Warning: GOOGLE_MAPS_API_KEY not provided. Map searches will not work.")
-        elif not SERPAPI_AVAILABLE:
-            print("Warning: serpapi package not available. Map searches will not work.")
+
+        # Geocoding results and place details barely change, so keep them around
+        self.cache = TieredCache(
+            path=Config.MAPS_CACHE_PATH,
+            max_size=Config.MAPS_CACHE_SIZE
+        )
+        self.cache_counters = {
+            method: {'hits': 0, 'misses': 0}
+            for method in ('search', 'geocode', 'reverse_geocode', 'place_details')
+        }
+
+    def _cached(self, method, key, ttl, fetch):
+        """
+        Return a cached lookup result, calling fetch() on a miss.
+        Failed lookups (None) are cached as negative entries with a short TTL.
+        """
+        cache_key = f"{method}:{key}"
+        counters = self.cache_counters[method]
+        value = self.cache.get(cache_key)
+        if value is not None:
+            counters['hits'] += 1
+            return None if value == NEGATIVE else value
+
+        counters['misses'] += 1
+        value = fetch()
+        if value is None:
+            self.cache.set(cache_key, NEGATIVE, Config.MAPS_NEGATIVE_TTL)
+        else:
+            self.cache.set(cache_key, value, ttl)
+        return value
+
+    def _serpapi(self, params):
+        """Run a SerpApi search and return the JSON result"""
+        response = self.http.request('GET', SERPAPI_URL, params=params)
+        results = response.json()
+        if results.get('error') and not results.get('local_results') and not results.get('place_results'):
+            # "Google hasn't returned any results" is a valid empty answer
+            if "hasn't returned any results" not in results['error']:
+                raise RuntimeError(results['error'])
+        return results
+
+    def cache_stats(self):
+        """Hit/miss counters per cached method plus per-tier cache stats"""
+        return {'methods': self.cache_counters, 'tiers': self.cache.stats()}
 
     def search_places(self, query, location=None, radius=10000, type=None):
         """
@@ -35,26 +78,39 @@ class MapsService:
         Returns:
             List of place dictionaries
         """
-        if not self.client or not GoogleSearch:
+        if not self.client:
             print("Maps service not available. Skipping place search.")
             return []
 
+        # Results are shared per geohash cell, so nearby users hit the same entry
+        search_query = query if not type else f"{type} {query}"
+        normalized = ' '.join(search_query.lower().split())
+        coords = parse_location(location)
+        cell = None
+        candidates = ['-']
+        if coords:
+            cell = geohash_encode(coords[0], coords[1], Config.MAPS_SEARCH_GEOHASH_PRECISION)
+            candidates = [cell] + geohash_neighbours(cell)
+        for candidate in candidates:
+            cached = self.cache.get(f"search:{normalized}:{candidate}")
+            if cached is not None:
+                self.cache_counters['search']['hits'] += 1
+                return cached
+        self.cache_counters['search']['misses'] += 1
+
         try:
             params = {
                 "engine": "google_maps",
-                "q": query if not type else f"{type} {query}",
+                "q": search_query,
                 "api_key": self.api_key,
             }
             
-            # Add location if provided
-            if location and isinstance(location, dict):
-                lat = location.get('lat')
-                lng = location.get('lng')
-                if lat and lng:
-                    params["ll"] = f"@{lat},{lng},14z"
+            # Search from the cell center so the cached entry fits the whole cell
+            if cell:
+                lat, lng = geohash_center(cell)
+                params["ll"] = f"@{lat:.6f},{lng:.6f},14z"
             
-            search = GoogleSearch(params)  # type: ignore
-            results = search.get_dict()
+            results = self._serpapi(params)
             local_results = results.get("local_results", [])
             
             # Transform results to a consistent format
@@ -74,6 +130,7 @@ class MapsService:
                     'thumbnail': result.get('thumbnail', '')
                 })
             
+            self.cache.set(f"search:{normalized}:{cell or '-'}", places, Config.MAPS_SEARCH_TTL)
             return places
         except Exception as e:
             print(f"SerpApi place search error: {e}")
@@ -83,7 +140,7 @@ class MapsService:
         """
         General Google search using SerpApi
         """
-        if not self.client or not GoogleSearch:
+        if not self.client:
             print("Maps service not available. Skipping Google search.")
             return []
 
@@ -94,8 +151,7 @@ class MapsService:
                 "api_key": self.api_key,
                 "num": num_results
             }
-            search = GoogleSearch(params)  # type: ignore
-            results = search.get_dict()
+            results = self._serpapi(params)
             return results.get("organic_results", [])
         except Exception as e:
             print(f"SerpApi search error: {e}")
@@ -103,19 +159,23 @@ class MapsService:
 
     def geocode(self, address):
         """
-        Geocode an address to coordinates using SerpApi
+        Geocode an address to coordinates using SerpApi (cached)
         """
-        if not self.client or not GoogleSearch:
+        if not self.client:
             return None
-            
+
+        key = ' '.join(str(address).lower().split())
+        return self._cached('geocode', key, Config.MAPS_GEOCODE_TTL,
+                            lambda: self._fetch_geocode(address))
+
+    def _fetch_geocode(self, address):
         try:
             params = {
                 "engine": "google_maps",
                 "q": address,
                 "api_key": self.api_key,
             }
-            search = GoogleSearch(params)  # type: ignore
-            results = search.get_dict()
+            results = self._serpapi(params)
             
             if results.get("place_results"):
                 place = results["place_results"]
@@ -143,19 +203,22 @@ class MapsService:
 
     def get_place_details(self, place_id):
         """
-        Get detailed information about a place using SerpApi
+        Get detailed information about a place using SerpApi (cached)
         """
-        if not self.client or not GoogleSearch:
+        if not self.client:
             return None
-            
+
+        return self._cached('place_details', place_id, Config.MAPS_PLACE_DETAILS_TTL,
+                            lambda: self._fetch_place_details(place_id))
+
+    def _fetch_place_details(self, place_id):
         try:
             params = {
                 "engine": "google_maps",
                 "place_id": place_id,
                 "api_key": self.api_key,
             }
-            search = GoogleSearch(params)  # type: ignore
-            results = search.get_dict()
+            results = self._serpapi(params)
             
             place = results.get("place_results", {})
             if place:
@@ -195,8 +258,6 @@ class MapsService:
         Returns:
             Distance in meters
         """
-        import math
-        
         if not origin or not destination:
             return None
             
@@ -208,24 +269,36 @@ class MapsService:
         if None in [lat1, lng1, lat2, lng2]:
             return None
         
-        # Haversine formula
-        R = 6371000  # Earth's radius in meters
-        
-        phi1 = math.radians(lat1)
-        phi2 = math.radians(lat2)
-        delta_phi = math.radians(lat2 - lat1)
-        delta_lambda = math.radians(lng2 - lng1)
-        
-        a = math.sin(delta_phi/2)**2 + math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda/2)**2
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-        
-        return R * c  # Distance in meters
+        return haversine(lat1, lng1, lat2, lng2)  # Distance in meters
+
+    def calculate_distance_matrix(self, origins, destinations):
+        """
+        Distances in meters from every origin to every destination,
+        computed in one vectorized pass.
+
+        Args:
+            origins: list of dicts with 'lat' and 'lng'
+            destinations: list of dicts with 'lat' and 'lng'
+
+        Returns:
+            N x M list of distances; None where a point is missing or invalid
+        """
+        origin_coords = [parse_location(o) for o in origins]
+        dest_coords = [parse_location(d) for d in destinations]
+        nan = (float('nan'), float('nan'))
+        o = [c or nan for c in origin_coords]
+        d = [c or nan for c in dest_coords]
+        matrix = haversine_matrix(
+            [c[0] for c in o], [c[1] for c in o],
+            [c[0] for c in d], [c[1] for c in d]
+        )
+        return [[None if math.isnan(value) else value for value in row] for row in matrix.tolist()]
 
     def get_directions(self, origin, destination):
         """
         Get directions using SerpApi Google Maps Directions
         """
-        if not self.client or not GoogleSearch:
+        if not self.client:
             return None
             
         try:
@@ -239,8 +312,7 @@ class MapsService:
                 "end_addr": dest_str,
                 "api_key": self.api_key,
             }
-            search = GoogleSearch(params)  # type: ignore
-            results = search.get_dict()
+            results = self._serpapi(params)
             
             directions = results.get("directions", [])
             if directions:
@@ -256,19 +328,26 @@ class MapsService:
 
     def reverse_geocode(self, lat, lng):
         """
-        Get address from coordinates using SerpApi
+        Get address from coordinates using SerpApi (cached)
         """
-        if not self.client or not GoogleSearch:
+        if not self.client:
             return None
-            
+
+        try:
+            key = f"{float(lat):.6f},{float(lng):.6f}"
+        except (TypeError, ValueError):
+            key = f"{lat},{lng}"
+        return self._cached('reverse_geocode', key, Config.MAPS_REVERSE_GEOCODE_TTL,
+                            lambda: self._fetch_reverse_geocode(lat, lng))
+
+    def _fetch_reverse_geocode(self, lat, lng):
         try:
             params = {
                 "engine": "google_maps",
                 "q": f"{lat},{lng}",
                 "api_key": self.api_key,
             }
-            search = GoogleSearch(params)  # type: ignore
-            results = search.get_dict()
+            results = self._serpapi(params)
             
             if results.get("place_results"):
                 place = results["place_results"]
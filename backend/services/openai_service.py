@@ -1,18 +1,51 @@
 # OpenAI Service
+import json
+
 from config import Config
+from utils.cache import TTLCache, SingleFlight
+from utils.http_client import get_provider
 
 class OpenAIService:
     def __init__(self):
         self.client = None
+        # Identical queries share one completion: cached, or joined while in flight
+        self.cache = TTLCache(max_size=Config.OPENAI_CACHE_SIZE, ttl=Config.OPENAI_CACHE_TTL)
+        self.inflight = SingleFlight()
+        self.http = get_provider('openai')
+        self.retry_on = ()
         if Config.OPENAI_API_KEY:
             try:
                 import openai
-                self.client = openai.OpenAI(api_key=Config.OPENAI_API_KEY)
+                # Retries, concurrency limits and circuit breaking come from the shared provider
+                self.client = openai.OpenAI(
+                    api_key=Config.OPENAI_API_KEY,
+                    max_retries=0,
+                    timeout=self.http.timeout
+                )
+                self.retry_on = (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
             except Exception as e:
                 print(f"Warning: Could not initialize OpenAI client: {e}")
                 self.client = None
         else:
             print("Warning: OPENAI_API_KEY not provided. AI features will be disabled.")
+
+    def _cached(self, kind, query, complete):
+        """Return a cached completion for the normalized query, computing it at most once"""
+        key = f"{kind}:{' '.join(str(query).lower().split())}"
+        value = self.cache.get(key)
+        if value is not None:
+            return value
+
+        def load():
+            result = complete()
+            if result is not None:
+                self.cache.set(key, result)
+            return result
+
+        return self.inflight.do(key, load)
+
+    def cache_stats(self):
+        return {**self.cache.stats(), 'shared_inflight': self.inflight.shared}
     
     def process_search_query(self, query):
         """Process search query and return enhanced search terms"""
@@ -20,19 +53,24 @@ class OpenAIService:
             return query  # Return original query if no API key
         
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a service search assistant. Extract keywords from the user's query."},
-                    {"role": "user", "content": query}
-                ],
-                max_tokens=100,
-                temperature=0.3
-            )
-            return response.choices[0].message.content.strip()
+            return self._cached('keywords', query, lambda: self._complete_search_query(query))
         except Exception as e:
             print(f"OpenAI error: {e}")
             return query
+
+    def _complete_search_query(self, query):
+        response = self.http.call(
+            self.client.chat.completions.create,
+            retry_on=self.retry_on,
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "system", "content": "You are a service search assistant. Extract keywords from the user's query."},
+                {"role": "user", "content": query}
+            ],
+            max_tokens=100,
+            temperature=0.3
+        )
+        return response.choices[0].message.content.strip()
     
     def generate_google_maps_filters(self, query):
         """Generate Google Maps search filters based on user query using AI"""
@@ -40,21 +78,25 @@ class OpenAIService:
             return None
         
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a Google Maps search assistant. Based on the user's query, determine what type of service or business they're looking for. Return a JSON object with: 'type' (business type like 'hair salon', 'massage', 'repair shop'), 'keyword' (main search keyword), and 'location' (if mentioned)."},
-                    {"role": "user", "content": query}
-                ],
-                max_tokens=150,
-                temperature=0.3,
-                response_format={"type": "json_object"}
-            )
-            import json
-            return json.loads(response.choices[0].message.content)
+            return self._cached('maps_filters', query, lambda: self._complete_maps_filters(query))
         except Exception as e:
             print(f"OpenAI Google Maps filter error: {e}")
             return None
+
+    def _complete_maps_filters(self, query):
+        response = self.http.call(
+            self.client.chat.completions.create,
+            retry_on=self.retry_on,
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "system", "content": "You are a Google Maps search assistant. Based on the user's query, determine what type of service or business they're looking for. Return a JSON object with: 'type' (business type like 'hair salon', 'massage', 'repair shop'), 'keyword' (main search keyword), and 'location' (if mentioned)."},
+                {"role": "user", "content": query}
+            ],
+            max_tokens=150,
+            temperature=0.3,
+            response_format={"type": "json_object"}
+        )
+        return json.loads(response.choices[0].message.content)
     
     def generate_recommendations(self, user_history, available_services):
         """Generate service recommendations based on user history"""
@@ -65,7 +107,9 @@ class OpenAIService:
             history_text = ", ".join([s.get('name', '') for s in user_history[:5]])
             services_text = ", ".join([s.get('name', '') for s in available_services[:10]])
             
-            response = self.client.chat.completions.create(
+            response = self.http.call(
+                self.client.chat.completions.create,
+                retry_on=self.retry_on,
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "Ты помощник для рекомендации услуг. Рекомендуй услуги на основе истории пользователя."},
@@ -0,0 +1,344 @@
+# Data access engines behind SupabaseService
+import json
+import os
+import re
+import sqlite3
+import threading
+
+from config import Config
+
+_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+# Tables and their known columns; unknown columns are added on first write
+SCHEMA = {
+    'users': ['email', 'password_hash', 'user_type', 'full_name', 'address'],
+    'companies': [
+        'user_id', 'name', 'email', 'phone', 'address', 'description', 'location', 'lat', 'lng',
+        'allow_reschedule', 'min_cancel_hours', 'cancel_penalty', 'break_start', 'break_end',
+        'break_duration', 'auto_deduction', 'deduction_type', 'deduction_value', 'billing_frequency',
+    ],
+    'services': [
+        'company_id', 'name', 'company', 'description', 'category', 'price', 'duration', 'rating',
+        'image', 'address', 'location', 'lat', 'lng',
+    ],
+    'masters': ['company_id', 'service_id', 'name', 'photo', 'specialization', 'rating'],
+    'bookings': ['client_id', 'service_id', 'master_id', 'company_id', 'date', 'time', 'status'],
+    'favorites': ['client_id', 'service_id'],
+    'reviews': ['service_id', 'client_id', 'author', 'rating', 'text', 'date'],
+    'work_examples': ['service_id', 'image', 'description'],
+    'promotions': ['company_id', 'type', 'description', 'discount', 'conditions'],
+    'client_blacklist': ['client_id', 'company_id'],
+    'revoked_tokens': ['jti', 'expires_at'],
+}
+
+# Lookup columns that get an index in every table that has them
+INDEXED_COLUMNS = ('email', 'service_id', 'company_id', 'client_id', 'master_id', 'user_id', 'updated_at')
+
+# Columns holding objects / lists, stored as JSON text
+JSON_COLUMNS = {'location', 'conditions', 'settings'}
+
+# Numeric affinity so that ids and prices compare equal whether passed as int or str
+NUMERIC_COLUMNS = {'price', 'duration', 'rating', 'discount', 'lat', 'lng', 'min_cancel_hours', 'cancel_penalty',
+                   'break_duration', 'deduction_value', 'expires_at'}
+
+
+def _column_type(column):
+    if column == 'id' or column.endswith('_id'):
+        return 'INTEGER'
+    if column in NUMERIC_COLUMNS:
+        return 'NUMERIC'
+    return ''
+
+
+def _check_identifier(name):
+    if not _IDENTIFIER.match(name):
+        raise ValueError(f"Invalid identifier: {name}")
+    return name
+
+
+class Result:
+    """Query result with a .data list of row dicts, like the Supabase client's responses"""
+
+    def __init__(self, data):
+        self.data = data
+
+
+class SupabaseRepository:
+    """Remote engine: Supabase's PostgREST client"""
+
+    name = 'supabase'
+
+    def __init__(self, url, key):
+        from supabase import create_client
+        self.client = create_client(url, key)
+
+    def table(self, table_name):
+        return self.client.table(table_name)
+
+
+class SQLiteQuery:
+    """
+    The subset of the PostgREST query builder SupabaseService uses:
+    select / insert / update / delete, eq / neq / gt / gte / lt / lte /
+    ilike / in_ / or_ filters, order, limit and range.
+    """
+
+    def __init__(self, repository, table_name):
+        self.repo = repository
+        self.table_name = _check_identifier(table_name)
+        self.action = 'select'
+        self.columns = '*'
+        self.values = None
+        self.where = []
+        self.params = []
+        self.order_by = []
+        self.limit_count = None
+        self.offset_count = 0
+
+    # Actions
+    def select(self, columns='*'):
+        self.action = 'select'
+        self.columns = columns
+        return self
+
+    def insert(self, values):
+        self.action = 'insert'
+        self.values = values if isinstance(values, list) else [values]
+        return self
+
+    def update(self, values):
+        self.action = 'update'
+        self.values = values
+        return self
+
+    def delete(self):
+        self.action = 'delete'
+        return self
+
+    # Filters
+    def _filter(self, column, operator, value):
+        self.where.append(f"{_check_identifier(column)} {operator} ?")
+        self.params.append(self.repo.encode(column, value))
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, '=', value)
+
+    def neq(self, column, value):
+        return self._filter(column, '!=', value)
+
+    def gt(self, column, value):
+        return self._filter(column, '>', value)
+
+    def gte(self, column, value):
+        return self._filter(column, '>=', value)
+
+    def lt(self, column, value):
+        return self._filter(column, '<', value)
+
+    def lte(self, column, value):
+        return self._filter(column, '<=', value)
+
+    def ilike(self, column, pattern):
+        # SQLite's LIKE is case-insensitive for ASCII, like ilike
+        return self._filter(column, 'LIKE', pattern.replace('*', '%'))
+
+    def in_(self, column, values):
+        values = list(values)
+        if not values:
+            self.where.append('0')
+            return self
+        self.where.append(f"{_check_identifier(column)} IN ({', '.join('?' * len(values))})")
+        self.params.extend(self.repo.encode(column, v) for v in values)
+        return self
+
+    def or_(self, filters):
+        """PostgREST or-filter: 'col.op.value,col.op.value' with op eq or ilike"""
+        clauses = []
+        for part in filters.split(','):
+            column, operator, value = part.split('.', 2)
+            if operator not in ('eq', 'ilike'):
+                raise ValueError(f"Unsupported or_ operator: {operator}")
+            clauses.append(f"{_check_identifier(column)} {'=' if operator == 'eq' else 'LIKE'} ?")
+            self.params.append(value.replace('*', '%') if operator == 'ilike' else value)
+        self.where.append(f"({' OR '.join(clauses)})")
+        return self
+
+    # Modifiers
+    def order(self, column, desc=False):
+        self.order_by.append(f"{_check_identifier(column)} {'DESC' if desc else 'ASC'}")
+        return self
+
+    def limit(self, count):
+        self.limit_count = int(count)
+        return self
+
+    def range(self, start, end):
+        self.offset_count = int(start)
+        self.limit_count = int(end) - int(start) + 1
+        return self
+
+    def _projection(self):
+        if self.columns in (None, '', '*'):
+            return '*'
+        return ', '.join(_check_identifier(c.strip()) for c in self.columns.split(','))
+
+    def _where_sql(self):
+        return f" WHERE {' AND '.join(self.where)}" if self.where else ''
+
+    def execute(self):
+        conn = self.repo.connect()
+        self.repo.ensure_table(self.table_name)
+        if self.action == 'insert':
+            return Result(self.repo.insert_rows(self.table_name, self.values))
+
+        if self.action == 'select':
+            sql = f"SELECT {self._projection()} FROM {self.table_name}{self._where_sql()}"
+            if self.order_by:
+                sql += f" ORDER BY {', '.join(self.order_by)}"
+            if self.limit_count is not None:
+                sql += f" LIMIT {self.limit_count} OFFSET {self.offset_count}"
+            return Result(self.repo.fetch(sql, self.params))
+
+        # update / delete: return the affected rows, as PostgREST does
+        ids = [row['id'] for row in self.repo.fetch(
+            f"SELECT id FROM {self.table_name}{self._where_sql()}", self.params
+        )]
+        if not ids:
+            return Result([])
+        placeholders = ', '.join('?' * len(ids))
+        with self.repo.write_lock:
+            if self.action == 'delete':
+                rows = self.repo.fetch(f"SELECT * FROM {self.table_name} WHERE id IN ({placeholders})", ids)
+                conn.execute(f"DELETE FROM {self.table_name} WHERE id IN ({placeholders})", ids)
+                conn.commit()
+                return Result(rows)
+
+            values = dict(self.values)
+            values.pop('id', None)
+            if values:
+                self.repo.ensure_columns(self.table_name, values)
+                assignments = ', '.join(f"{_check_identifier(c)} = ?" for c in values)
+                if 'updated_at' not in values:
+                    assignments += ", updated_at = strftime('%Y-%m-%dT%H:%M:%fZ', 'now')"
+                conn.execute(
+                    f"UPDATE {self.table_name} SET {assignments} WHERE id IN ({placeholders})",
+                    [self.repo.encode(c, v) for c, v in values.items()] + ids
+                )
+                conn.commit()
+        return Result(self.repo.fetch(f"SELECT * FROM {self.table_name} WHERE id IN ({placeholders})", ids))
+
+
+class SQLiteRepository:
+    """
+    Embedded engine: one SQLite file with the SCHEMA tables and indexes on
+    the lookup columns. Used as a local stand-in for Supabase (offline
+    development, load tests) via DB_ENGINE=sqlite.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self.write_lock = threading.Lock()
+        self._columns = {}  # table -> set of columns
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        for table_name in SCHEMA:
+            self.ensure_table(table_name)
+
+    def connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def table(self, table_name):
+        return SQLiteQuery(self, table_name)
+
+    def ensure_table(self, table_name):
+        if table_name in self._columns:
+            return
+        with self.write_lock:
+            conn = self.connect()
+            columns = ', '.join(f"{c} {_column_type(c)}".strip() for c in SCHEMA.get(table_name, []))
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {_check_identifier(table_name)} ("
+                f"id INTEGER PRIMARY KEY AUTOINCREMENT, {columns + ', ' if columns else ''}"
+                f"created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')), "
+                f"updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')))"
+            )
+            existing = {row['name'] for row in conn.execute(f"PRAGMA table_info({table_name})")}
+            for column in INDEXED_COLUMNS:
+                if column in existing:
+                    conn.execute(f"CREATE INDEX IF NOT EXISTS {table_name}_{column} ON {table_name} ({column})")
+            conn.commit()
+            self._columns[table_name] = existing
+
+    def ensure_columns(self, table_name, values):
+        """Add columns the table doesn't have yet (schema follows the data, like a document store)"""
+        missing = [c for c in values if c not in self._columns[table_name]]
+        if not missing:
+            return
+        conn = self.connect()
+        for column in missing:
+            try:
+                conn.execute(f"ALTER TABLE {table_name} ADD COLUMN {_check_identifier(column)} {_column_type(column)}")
+            except sqlite3.OperationalError:
+                pass  # added concurrently by another worker
+            self._columns[table_name].add(column)
+        conn.commit()
+
+    def encode(self, column, value):
+        if isinstance(value, (dict, list)):
+            return json.dumps(value)
+        return value
+
+    def decode(self, row):
+        data = dict(row)
+        for column in JSON_COLUMNS.intersection(data):
+            if isinstance(data[column], str):
+                try:
+                    data[column] = json.loads(data[column])
+                except ValueError:
+                    pass
+        return data
+
+    def fetch(self, sql, params=()):
+        return [self.decode(row) for row in self.connect().execute(sql, params).fetchall()]
+
+    def insert_rows(self, table_name, rows):
+        inserted = []
+        with self.write_lock:
+            conn = self.connect()
+            for row in rows:
+                self.ensure_columns(table_name, row)
+                columns = list(row)
+                cursor = conn.execute(
+                    f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+                    if columns else f"INSERT INTO {table_name} DEFAULT VALUES",
+                    [self.encode(c, row[c]) for c in columns]
+                )
+                inserted.append(cursor.lastrowid)
+            conn.commit()
+        if not inserted:
+            return []
+        return self.fetch(
+            f"SELECT * FROM {table_name} WHERE id IN ({', '.join('?' * len(inserted))}) ORDER BY id", inserted
+        )
+
+
+def create_repository():
+    """The engine selected by Config.DB_ENGINE, or None when it isn't configured"""
+    if Config.DB_ENGINE == 'sqlite':
+        return SQLiteRepository(Config.SQLITE_PATH)
+    if Config.SUPABASE_URL and Config.SUPABASE_KEY:
+        return SupabaseRepository(Config.SUPABASE_URL, Config.SUPABASE_KEY)
+    print("Warning: SUPABASE_URL or SUPABASE_KEY not provided. Database features will be disabled.")
+    return None
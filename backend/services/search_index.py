@@ -0,0 +1,325 @@
+# In-process full-text index over the services catalogue
+import bisect
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    """Split text into lowercase word tokens"""
+    if not text:
+        return []
+    return TOKEN_RE.findall(str(text).lower())
+
+
+def trigrams(token):
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+class SearchIndex:
+    """
+    Inverted index over service name, description and category.
+
+    Query tokens are matched as substrings of indexed tokens (like the old
+    ilike '%q%' search) through trigram postings over the vocabulary; tokens
+    shorter than 3 characters fall back to prefix lookups on the sorted vocabulary.
+    """
+
+    FIELDS = ('name', 'description', 'category')
+
+    # BM25 parameters and per-field weights for ranking
+    K1 = 1.2
+    B = 0.75
+    FIELD_WEIGHTS = {'name': 2.0, 'description': 1.0}
+    # Indexed tokens scored per query token (closest matches first), like
+    # max_expansions in Elasticsearch; a short prefix such as 's' matches hundreds
+    MAX_EXPANSIONS = 50
+    # How much rating (0..5) and proximity add on top of text relevance
+    RATING_WEIGHT = 0.5
+    DISTANCE_WEIGHT = 1.0
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.docs = {}          # service id -> row
+        self.doc_tokens = {}    # service id -> set of tokens
+        self.postings = {}      # token -> set of service ids
+        self.trigram_postings = {}  # trigram -> set of tokens
+        self.vocabulary = []    # sorted tokens for prefix lookups
+        self.categories = {}    # category -> set of service ids
+        self.doc_stats = {}     # service id -> ({token: counts per weighted field}, field lengths, rating score)
+        self.field_length_totals = {field: 0 for field in self.FIELD_WEIGHTS}
+        self.ready = False
+
+    def build(self, rows):
+        """Replace the index contents with the given rows"""
+        with self._lock:
+            self.docs.clear()
+            self.doc_tokens.clear()
+            self.postings.clear()
+            self.trigram_postings.clear()
+            self.categories.clear()
+            self.doc_stats.clear()
+            self.field_length_totals = {field: 0 for field in self.FIELD_WEIGHTS}
+            self.vocabulary = []
+            for row in rows:
+                self._add(row)
+            self.vocabulary.sort()
+            self.ready = True
+
+    def add(self, row):
+        """Index a new row, or re-index an updated one"""
+        if not row or row.get('id') is None:
+            return
+        with self._lock:
+            existing = self.docs.get(row['id'])
+            if existing:
+                # Partial updates only carry changed columns
+                row = {**existing, **row}
+                self._remove(row['id'])
+            self._add(row, keep_sorted=True)
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._remove(doc_id)
+
+    def _add(self, row, keep_sorted=False):
+        doc_id = row['id']
+        tokens = set()
+        for field in self.FIELDS:
+            tokens.update(tokenize(row.get(field)))
+        self.docs[doc_id] = row
+        self.doc_tokens[doc_id] = tokens
+        self.categories.setdefault(row.get('category'), set()).add(doc_id)
+        counters = [Counter(tokenize(row.get(field))) for field in self.FIELD_WEIGHTS]
+        lengths = tuple(sum(counter.values()) for counter in counters)
+        for field, length in zip(self.FIELD_WEIGHTS, lengths):
+            self.field_length_totals[field] += length
+        freqs = {
+            token: tuple(counter[token] for counter in counters)
+            for token in set().union(*counters)
+        }
+        try:
+            # Clamped so that rank() can bound the bonus
+            rating = self.RATING_WEIGHT * min(max(float(row.get('rating') or 0), 0.0), 5.0) / 5
+        except (TypeError, ValueError):
+            rating = 0.0
+        # Replaced, never mutated: rank() scores on references taken under the lock
+        self.doc_stats[doc_id] = (freqs, lengths, rating)
+        for token in tokens:
+            ids = self.postings.get(token)
+            if ids is None:
+                ids = self.postings[token] = set()
+                for gram in trigrams(token):
+                    self.trigram_postings.setdefault(gram, set()).add(token)
+                if keep_sorted:
+                    bisect.insort(self.vocabulary, token)
+                else:
+                    self.vocabulary.append(token)
+            ids.add(doc_id)
+
+    def _remove(self, doc_id):
+        row = self.docs.pop(doc_id, None)
+        if row is not None:
+            ids = self.categories.get(row.get('category'))
+            if ids is not None:
+                ids.discard(doc_id)
+                if not ids:
+                    del self.categories[row.get('category')]
+        stats = self.doc_stats.pop(doc_id, None)
+        if stats is not None:
+            for field, length in zip(self.FIELD_WEIGHTS, stats[1]):
+                self.field_length_totals[field] -= length
+        for token in self.doc_tokens.pop(doc_id, ()):
+            ids = self.postings.get(token)
+            if ids is None:
+                continue
+            ids.discard(doc_id)
+            if ids:
+                continue
+            # Last document using this token: drop it from the vocabulary
+            del self.postings[token]
+            for gram in trigrams(token):
+                grams = self.trigram_postings.get(gram)
+                if grams is not None:
+                    grams.discard(token)
+                    if not grams:
+                        del self.trigram_postings[gram]
+            i = bisect.bisect_left(self.vocabulary, token)
+            if i < len(self.vocabulary) and self.vocabulary[i] == token:
+                del self.vocabulary[i]
+
+    def _matching_tokens(self, query_token):
+        """Indexed tokens that contain (or, for short tokens, start with) query_token"""
+        if len(query_token) < 3:
+            start = bisect.bisect_left(self.vocabulary, query_token)
+            end = bisect.bisect_left(self.vocabulary, query_token + '\uffff')
+            return self.vocabulary[start:end]
+
+        candidates = None
+        for gram in sorted(trigrams(query_token), key=lambda g: len(self.trigram_postings.get(g, ()))):
+            tokens = self.trigram_postings.get(gram)
+            if not tokens:
+                return []
+            candidates = set(tokens) if candidates is None else candidates & tokens
+            if not candidates:
+                return []
+        return [token for token in candidates if query_token in token]
+
+    def _expand(self, query):
+        """Map indexed tokens matched by the query to (weight, idf)"""
+        total = len(self.docs)
+        expansions = {}
+        for query_token in tokenize(query):
+            matches = []
+            for token in self._matching_tokens(query_token):
+                df = len(self.postings[token])
+                idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+                # Partial (substring/prefix) matches count less than whole tokens
+                matches.append((token, len(query_token) / len(token), idf))
+            if len(matches) > self.MAX_EXPANSIONS:
+                matches = heapq.nlargest(self.MAX_EXPANSIONS, matches, key=lambda m: m[1] * m[2])
+            for token, weight, idf in matches:
+                if expansions.get(token, (0, 0))[0] < weight:
+                    expansions[token] = (weight, idf)
+        return expansions
+
+    def rank(self, query, filters=None, limit=20, offset=0, distances=None, restrict=False):
+        """
+        Score matching rows with BM25 blended with rating and distance,
+        and return (page of rows, total matches).
+        distances optionally maps ids to meters from the user; with restrict,
+        ids missing from it (e.g. outside the search radius) are dropped.
+
+        Matching and a snapshot of the postings / document statistics are
+        taken under the lock; scoring runs outside it so that index updates
+        are not held up by broad queries.
+        """
+        filters = filters or {}
+        with self._lock:
+            ids = self.match(query, filters.get('category'))
+            if restrict:
+                ids &= distances.keys()
+            total = len(ids)
+            if not ids or limit <= 0:
+                return [], total
+
+            doc_count = max(len(self.docs), 1)
+            avg_lengths = {
+                field: max(self.field_length_totals[field] / doc_count, 1.0)
+                for field in self.FIELD_WEIGHTS
+            }
+            terms = [
+                (token, weight * idf, self.postings[token] & ids)
+                for token, (weight, idf) in self._expand(query).items()
+            ]
+            if len(ids) * 8 < len(self.doc_stats):
+                stats = {doc_id: self.doc_stats[doc_id] for doc_id in ids}
+            else:
+                stats = self.doc_stats.copy()
+
+        top = self._top(ids, terms, stats, avg_lengths, offset + limit, distances)
+        with self._lock:
+            # Rows removed while scoring are skipped
+            return self._page([doc_id for doc_id in top[offset:] if doc_id in self.docs], distances), total
+
+    def _top(self, ids, terms, stats, avg_lengths, k, distances):
+        """
+        Ids of the k best-scoring documents.
+
+        BM25 is accumulated term at a time over the postings. Rating and
+        distance add at most bonus_bound, so only documents whose text score
+        comes within bonus_bound of the k-th best need the full score.
+        """
+        # field weight * f * (K1 + 1) / (f + K1 * (1 - B + B * length / average)), constants hoisted
+        base = self.K1 * (1 - self.B)
+        fields = tuple(
+            (weight * (self.K1 + 1), self.K1 * self.B / avg_lengths[field])
+            for field, weight in self.FIELD_WEIGHTS.items()
+        )
+        scores = {}
+        for token, term_weight, doc_ids in terms:
+            for doc_id in doc_ids:
+                freqs, lengths, _ = stats[doc_id]
+                counts = freqs.get(token)
+                if not counts:
+                    continue  # only in the category
+                value = 0.0
+                for f, length, (scale, slope) in zip(counts, lengths, fields):
+                    if f:
+                        value += scale * f / (f + base + slope * length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + term_weight * value
+
+        def score(doc_id):
+            value = scores.get(doc_id, 0.0) + stats[doc_id][2]
+            if distances and doc_id in distances:
+                value += self.DISTANCE_WEIGHT / (1 + distances[doc_id] / 1000)
+            return value
+
+        candidates = ids
+        bonus_bound = self.RATING_WEIGHT + (self.DISTANCE_WEIGHT if distances else 0)
+        if len(scores) >= k:
+            threshold = heapq.nlargest(k, scores.values())[-1]
+            candidates = [doc_id for doc_id, value in scores.items() if value + bonus_bound >= threshold]
+            if threshold <= bonus_bound:
+                # Documents without a text score could still make the page on rating / distance
+                candidates.extend(doc_id for doc_id in ids if doc_id not in scores)
+        return heapq.nlargest(k, candidates, key=score)
+
+    def rank_by_order(self, query, filters, ordered_ids, limit=20, offset=0, distances=None):
+        """Page through matching rows in the given id order (e.g. nearest first)"""
+        filters = filters or {}
+        with self._lock:
+            ids = self.match(query, filters.get('category'))
+            total = len(ids.intersection(ordered_ids))
+            page = []
+            skipped = 0
+            for doc_id in ordered_ids:
+                if doc_id not in ids:
+                    continue
+                if skipped < offset:
+                    skipped += 1
+                    continue
+                page.append(doc_id)
+                if len(page) >= limit:
+                    break
+            return self._page(page, distances), total
+
+    def _page(self, ids, distances):
+        """Rows for a page of ids, annotated with distance in km when known"""
+        rows = []
+        for doc_id in ids:
+            row = self.docs[doc_id]
+            if distances and doc_id in distances:
+                row = {**row, 'distance': round(distances[doc_id] / 1000, 2)}
+            rows.append(row)
+        return rows
+
+    def match(self, query, category=None):
+        """Return ids of documents containing every query token"""
+        with self._lock:
+            result = None
+            if category:
+                result = set(self.categories.get(category, ()))
+            query_tokens = tokenize(query)
+            if not query_tokens:
+                return set(self.docs) if result is None else result
+
+            for query_token in query_tokens:
+                ids = set()
+                for token in self._matching_tokens(query_token):
+                    ids |= self.postings[token]
+                result = ids if result is None else result & ids
+                if not result:
+                    return set()
+            return result
+
+    def search(self, query, filters=None):
+        """Return matching rows, honouring the category filter"""
+        filters = filters or {}
+        ids = self.match(query, filters.get('category'))
+        with self._lock:
+            return [self.docs[i] for i in sorted(ids) if i in self.docs]
@@ -0,0 +1,196 @@
+# Search Service - service search across our database and Google Maps
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from config import Config
+from services.supabase_service import supabase_service
+from services.openai_service import openai_service
+from services.maps_service import maps_service
+from services.intent_classifier import intent_classifier
+from utils.concurrency import executor
+from utils.geo import parse_location
+
+
+def place_to_service(place, place_type=None):
+    """Convert a Google Maps place into the service format used by the frontend"""
+    return {
+        'id': f"google_{place.get('place_id', '')}",
+        'name': place.get('name', ''),
+        'company': place.get('name', ''),
+        'address': place.get('address', ''),
+        'rating': place.get('rating', 0),
+        'category': place_type or 'other',
+        'price': 0,  # Price not available from Google Maps
+        'image': place.get('thumbnail'),
+        'description': 'Found via Google Maps',
+        'location': place.get('location', {}),
+        'source': 'google_maps'
+    }
+
+
+class SearchService:
+    def external_available(self):
+        return bool(maps_service and maps_service.client)
+
+    def search_database(self, query, filters, limit, offset=0, user_location=None, sort=None):
+        """Ranked page of services from our database: (rows, total)"""
+        try:
+            return supabase_service.rank_services(
+                query, filters, limit, offset,
+                location=parse_location(user_location),
+                sort=sort
+            )
+        except Exception as e:
+            print(f"Supabase search error: {e}")
+            return [], 0
+
+    def maps_filters(self, query):
+        """
+        Google Maps filters (type, keyword) for a query: from the local intent
+        classifier when it is confident, otherwise from OpenAI
+        """
+        if not intent_classifier.trained and supabase_service.search_index.ready:
+            intent_classifier.train(list(supabase_service.search_index.docs.values()))
+
+        filters, confidence = intent_classifier.classify(query)
+        if filters and confidence >= Config.INTENT_CONFIDENCE_THRESHOLD:
+            intent_classifier.stats['local'] += 1
+            return filters
+
+        if not (openai_service and openai_service.client):
+            intent_classifier.stats['unclassified'] += 1
+            return None
+        intent_classifier.stats['llm'] += 1
+        return openai_service.generate_google_maps_filters(query)
+
+    def stats(self):
+        return {
+            'intent': intent_classifier.stats_snapshot(),
+            'openai_cache': openai_service.cache_stats()
+        }
+
+    def search_external(self, query, user_location=None, maps_filters=None):
+        """Search Google Maps, returning results in service format"""
+        search_keyword = query
+        place_type = None
+        if maps_filters:
+            search_keyword = maps_filters.get('keyword', query)
+            place_type = maps_filters.get('type')
+
+        google_results = maps_service.search_places(
+            query=search_keyword,
+            location=user_location,
+            radius=10000,  # 10km radius
+            type=place_type
+        )
+        return [place_to_service(place, place_type) for place in google_results]
+
+    def search(self, query, filters, limit, offset=0, user_location=None, sort=None, pipelined=None):
+        """
+        Search our database, falling back to Google Maps when nothing matches.
+
+        In pipelined mode the database query and the OpenAI filter generation
+        start together; the speculative OpenAI call is dropped as soon as the
+        database returns hits. The whole search is bounded by SEARCH_DEADLINE.
+
+        Returns:
+            dict with 'services', 'total' and 'timed_out'
+        """
+        if pipelined is None:
+            pipelined = Config.SEARCH_PIPELINED
+        deadline = time.monotonic() + Config.SEARCH_DEADLINE
+
+        def remaining():
+            return max(deadline - time.monotonic(), 0)
+
+        wants_external = bool(query) and self.external_available()
+        filters_future = None
+        if pipelined and wants_external:
+            filters_future = executor.submit(self.maps_filters, query)
+
+        if pipelined:
+            db_future = executor.submit(
+                self.search_database, query, filters, limit, offset, user_location, sort
+            )
+            try:
+                services, total = db_future.result(timeout=remaining())
+            except FutureTimeoutError:
+                if filters_future:
+                    filters_future.cancel()
+                return {'services': [], 'total': 0, 'timed_out': True}
+        else:
+            services, total = self.search_database(query, filters, limit, offset, user_location, sort)
+
+        if total or not wants_external:
+            if filters_future:
+                # Database answered: the speculative branch isn't needed
+                filters_future.cancel()
+            return {'services': services, 'total': total, 'timed_out': False}
+
+        try:
+            if filters_future:
+                maps_filters = filters_future.result(timeout=remaining())
+                external = executor.submit(self.search_external, query, user_location, maps_filters)
+                places = external.result(timeout=remaining())
+            else:
+                places = self.search_external(query, user_location, self.maps_filters(query))
+        except FutureTimeoutError:
+            return {'services': [], 'total': 0, 'timed_out': True}
+        except Exception as e:
+            print(f"Google Maps search error: {e}")
+            places = []
+
+        return {'services': places[offset:offset + limit], 'total': len(places), 'timed_out': False}
+
+    def search_stages(self, query, filters, limit, offset=0, user_location=None, sort=None):
+        """
+        Same search as search(), yielded stage by stage so callers can stream it:
+        ('services', database page), then ('external', Google Maps page) when
+        the database had nothing, then ('done', summary).
+        """
+        started = time.monotonic()
+        deadline = started + Config.SEARCH_DEADLINE
+
+        def remaining():
+            return max(deadline - time.monotonic(), 0)
+
+        wants_external = bool(query) and self.external_available()
+        # Filters for the fallback are generated while the database is queried
+        filters_future = executor.submit(self.maps_filters, query) if wants_external else None
+        db_future = executor.submit(self.search_database, query, filters, limit, offset, user_location, sort)
+
+        sources = []
+        timed_out = False
+        try:
+            services, total = db_future.result(timeout=remaining())
+        except FutureTimeoutError:
+            services, total, timed_out = [], 0, True
+        sources.append('database')
+        yield 'services', {'services': services, 'total': total, 'source': 'database'}
+
+        if total or timed_out or not wants_external:
+            if filters_future:
+                filters_future.cancel()
+        else:
+            try:
+                maps_filters = filters_future.result(timeout=remaining())
+                external = executor.submit(self.search_external, query, user_location, maps_filters)
+                places = external.result(timeout=remaining())
+            except FutureTimeoutError:
+                places, timed_out = [], True
+            except Exception as e:
+                print(f"Google Maps search error: {e}")
+                places = []
+            total = len(places)
+            sources.append('google_maps')
+            yield 'external', {'services': places[offset:offset + limit], 'total': total, 'source': 'google_maps'}
+
+        yield 'done', {
+            'total': total,
+            'sources': sources,
+            'timed_out': timed_out,
+            'elapsed_ms': int((time.monotonic() - started) * 1000)
+        }
+
+# Create global instance
+search_service = SearchService()
@@ -0,0 +1,93 @@
+# In-process spatial index over service coordinates
+import math
+import threading
+
+import numpy as np
+
+from utils.geo import EARTH_RADIUS_M, haversine_np
+
+
+class SpatialIndex:
+    """
+    Points sorted by latitude. A radius query binary-searches the latitude
+    band that can contain matches and computes haversine distances for that
+    band in one NumPy pass; k-nearest uses argpartition over the distances.
+    Arrays are rebuilt lazily after add/remove.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.points = {}  # id -> (lat, lng)
+        self._dirty = True
+        self._ids = np.empty(0, dtype=object)
+        self._lats = np.empty(0)
+        self._lngs = np.empty(0)
+
+    def build(self, points):
+        """Replace the index contents with an {id: (lat, lng)} mapping"""
+        with self._lock:
+            self.points = dict(points)
+            self._dirty = True
+
+    def add(self, point_id, coords):
+        with self._lock:
+            if coords:
+                self.points[point_id] = coords
+            else:
+                self.points.pop(point_id, None)
+            self._dirty = True
+
+    def remove(self, point_id):
+        with self._lock:
+            if self.points.pop(point_id, None) is not None:
+                self._dirty = True
+
+    def __len__(self):
+        return len(self.points)
+
+    def _arrays(self):
+        with self._lock:
+            if self._dirty:
+                ids = list(self.points)
+                coords = np.array([self.points[i] for i in ids], dtype=float).reshape(-1, 2)
+                order = np.argsort(coords[:, 0], kind='stable')
+                self._ids = np.array(ids, dtype=object)[order]
+                self._lats = coords[order, 0]
+                self._lngs = coords[order, 1]
+                self._dirty = False
+            return self._ids, self._lats, self._lngs
+
+    def within(self, location, radius_m=None):
+        """
+        Return (ids, distances in meters) for points within radius_m of
+        location (lat, lng), nearest first. Without a radius every point is returned.
+        """
+        ids, lats, lngs = self._arrays()
+        if radius_m is not None:
+            delta = math.degrees(radius_m / EARTH_RADIUS_M)
+            start = np.searchsorted(lats, location[0] - delta, side='left')
+            end = np.searchsorted(lats, location[0] + delta, side='right')
+            ids, lats, lngs = ids[start:end], lats[start:end], lngs[start:end]
+
+        distances = haversine_np(location[0], location[1], lats, lngs)
+        if radius_m is not None:
+            mask = distances <= radius_m
+            ids, distances = ids[mask], distances[mask]
+        order = np.argsort(distances, kind='stable')
+        return ids[order], distances[order]
+
+    def nearest(self, location, k, radius_m=None):
+        """Return (ids, distances) of the k nearest points, nearest first"""
+        ids, lats, lngs = self._arrays()
+        if radius_m is not None:
+            return tuple(a[:k] for a in self.within(location, radius_m))
+        if k <= 0 or not len(ids):
+            return ids[:0], lats[:0]
+
+        distances = haversine_np(location[0], location[1], lats, lngs)
+        if k < len(distances):
+            top = np.argpartition(distances, k - 1)[:k]
+        else:
+            top = np.arange(len(distances))
+        top = top[np.argsort(distances[top], kind='stable')]
+        return ids[top], distances[top]
@@ -1,41 +1,337 @@
 # Supabase Service
+import functools
+import threading
+import time
+from collections import Counter
+
 from config import Config
+from services.search_index import SearchIndex
+from services.spatial_index import SpatialIndex
+from services.repository import create_repository
+from services.catalogue_mirror import CatalogueMirror, MIRROR_TABLES
+from utils.geo import row_coordinates
+from utils.pagination import Page, encode_cursor
+from utils.bloom import BloomFilter
+from utils.cache import TTLCache, NEGATIVE
+from utils.concurrency import executor
+from utils.invalidation import invalidation_bus
+
+# Rows fetched per request when loading the search index
+INDEX_PAGE_SIZE = 1000
 
 class SupabaseService:
     def __init__(self):
-        self.supabase = None
-        if Config.SUPABASE_URL and Config.SUPABASE_KEY:
-            try:
-                from supabase import create_client
-                self.supabase = create_client(Config.SUPABASE_URL, Config.SUPABASE_KEY)
-            except Exception as e:
-                print(f"Warning: Could not connect to Supabase: {e}")
-        else:
-            print("Warning: SUPABASE_URL or SUPABASE_KEY not provided. Database features will be disabled.")
-    
+        self.db = None
+        self.search_index = SearchIndex()
+        self.spatial_index = SpatialIndex()
+        self.company_locations = {}  # company id -> (lat, lng)
+        self.users = TTLCache(max_size=Config.USER_CACHE_SIZE, ttl=Config.USER_CACHE_TTL)
+        self.user_emails = None  # BloomFilter of registered emails once loaded
+        self.user_emails_loaded_at = 0
+        self.user_stats = Counter()
+        self._user_emails_lock = threading.Lock()
+        self._user_emails_pending = None  # emails registered while the filter is being rebuilt
+        self.mirror = CatalogueMirror(self.get_table)
+        try:
+            # Supabase, or the embedded SQLite engine (DB_ENGINE=sqlite)
+            self.db = create_repository()
+        except Exception as e:
+            print(f"Warning: Could not connect to {Config.DB_ENGINE}: {e}")
+
+        if self.db:
+            self.build_search_index()
+            self._refresh_user_emails()
+            if Config.MIRROR_ENABLED:
+                self.mirror.start()
+            # Writes handled by other workers
+            for table_name in MIRROR_TABLES:
+                invalidation_bus.subscribe(table_name, functools.partial(self._on_catalogue_invalidated, table_name))
+            invalidation_bus.subscribe('users', self._on_users_invalidated)
+
+    def _fetch_all(self, table_name, columns='*'):
+        """Read a whole table page by page"""
+        table = self.get_table(table_name)
+        rows = []
+        start = 0
+        while True:
+            page = table.select(columns).order('id').range(start, start + INDEX_PAGE_SIZE - 1).execute().data
+            rows.extend(page)
+            if len(page) < INDEX_PAGE_SIZE:
+                return rows
+            start += INDEX_PAGE_SIZE
+
+    def build_search_index(self):
+        """Load services (and company coordinates) into the in-process search and spatial indexes"""
+        if not self.db:
+            return False
+        try:
+            rows = self._fetch_all('services')
+            self.company_locations = {}
+            for company in self._fetch_all('companies'):
+                coords = row_coordinates(company)
+                if coords:
+                    self.company_locations[company['id']] = coords
+            self.search_index.build(rows)
+            points = {row['id']: self._service_coordinates(row) for row in rows}
+            self.spatial_index.build((i, coords) for i, coords in points.items() if coords)
+            return True
+        except Exception as e:
+            print(f"Warning: Could not build search index: {e}")
+            return False
+
+    def _service_coordinates(self, row):
+        """A service's own coordinates, or its company's"""
+        return row_coordinates(row) or self.company_locations.get(row.get('company_id'))
+
+    def _index_service(self, row):
+        self.search_index.add(row)
+        indexed = self.search_index.docs.get(row.get('id'))
+        if indexed:
+            self.spatial_index.add(indexed['id'], self._service_coordinates(indexed))
+
+    def _keyset_page(self, table_name, column, value, limit=None, after=None, columns='*'):
+        """
+        Rows where column == value, ordered by id, starting after the row id
+        `after`. One extra row is fetched to tell whether another page follows.
+        """
+        table = self.get_table(table_name)
+        if not table:
+            return Page()
+        limit = limit or Config.PAGE_DEFAULT_LIMIT
+        query = table.select(columns).eq(column, value)
+        if after is not None:
+            query = query.gt('id', after)
+        rows = query.order('id').limit(limit + 1).execute().data or []
+        if len(rows) > limit:
+            rows = rows[:limit]
+            return Page(rows, encode_cursor(rows[-1]['id']))
+        return Page(rows)
+
+    def _mirror_write(self, table_name, result):
+        """Apply rows returned by an insert / update to the catalogue mirror and tell the other workers"""
+        rows = (result.data if result else None) or []
+        for row in rows:
+            self.mirror.upsert(table_name, row)
+        invalidation_bus.publish(table_name, [row.get('id') for row in rows])
+        return result
+
+    def _mirror_delete(self, table_name, result):
+        rows = (result.data if result else None) or []
+        for row in rows:
+            self.mirror.remove(table_name, row.get('id'))
+        invalidation_bus.publish(table_name, [row.get('id') for row in rows])
+        return result
+
+    def _on_catalogue_invalidated(self, table_name, ids):
+        """Rows changed by another worker: re-read them into the mirror and the search indexes"""
+        rows = self.get_table(table_name).select('*').in_('id', ids).execute().data or []
+        for row in rows:
+            self.mirror.upsert(table_name, row)
+            if table_name == 'services':
+                self._index_service(row)
+            elif table_name == 'companies':
+                self._update_company_location(row)
+        found = {row['id'] for row in rows}
+        for row_id in ids:
+            if row_id in found:
+                continue
+            self.mirror.remove(table_name, row_id)
+            if table_name == 'services':
+                self.search_index.remove(row_id)
+                self.spatial_index.remove(row_id)
+            elif table_name == 'companies':
+                self.company_locations.pop(row_id, None)
+
     def get_table(self, table_name):
-        if not self.supabase:
+        if not self.db:
             return None
-        return self.supabase.table(table_name)
+        return self.db.table(table_name)
     
     # User operations
+    def load_user_emails(self):
+        """Rebuild the Bloom filter of registered emails from the users table"""
+        try:
+            rows = self._fetch_all('users', 'id,email')
+            bloom = BloomFilter(max(Config.USER_BLOOM_CAPACITY, 2 * len(rows)), Config.USER_BLOOM_ERROR_RATE)
+            for row in rows:
+                if row.get('email'):
+                    bloom.add(row['email'])
+            with self._user_emails_lock:
+                for email in self._user_emails_pending or ():
+                    bloom.add(email)
+                self.user_emails = bloom
+                self.user_emails_loaded_at = time.time()
+            return True
+        except Exception as e:
+            print(f"Warning: Could not load user emails: {e}")
+            return False
+        finally:
+            with self._user_emails_lock:
+                self._user_emails_pending = None
+
+    def _refresh_user_emails(self):
+        """Rebuild the email filter in the background once it is older than USER_BLOOM_REFRESH"""
+        with self._user_emails_lock:
+            stale = time.time() - self.user_emails_loaded_at >= Config.USER_BLOOM_REFRESH
+            if not stale or self._user_emails_pending is not None:
+                return
+            self._user_emails_pending = set()
+        executor.submit(self.load_user_emails)
+
+    def _remember_email(self, email):
+        with self._user_emails_lock:
+            if self.user_emails is not None:
+                self.user_emails.add(email)
+            if self._user_emails_pending is not None:
+                self._user_emails_pending.add(email)
+
+    def _cache_user(self, user):
+        self.users.set(f"id:{user['id']}", user)
+        if user.get('email'):
+            self.users.set(f"email:{user['email']}", user)
+            self._remember_email(user['email'])
+
+    def invalidate_user(self, user_id):
+        """Drop a user's cached record (by id and by email)"""
+        cached = self.users.get(f"id:{user_id}")
+        self.users.delete(f"id:{user_id}")
+        if cached and cached is not NEGATIVE and cached.get('email'):
+            self.users.delete(f"email:{cached['email']}")
+
     def create_user(self, email, password_hash, user_type):
-        return self.get_table('users').insert({
+        result = self.get_table('users').insert({
             'email': email,
             'password_hash': password_hash,
             'user_type': user_type
         }).execute()
+        for user in result.data or []:
+            self._cache_user(user)
+        invalidation_bus.publish('users', [user['id'] for user in result.data or []])
+        return result
     
     def get_user_by_email(self, email):
+        """
+        User by email; unknown emails are cached briefly. The Bloom filter
+        may predate emails registered by another worker or written straight
+        to the database, so a miss is confirmed with the database once and
+        then answered from the negative entry until it expires.
+        """
+        cached = self.users.get(f"email:{email}")
+        if cached is not None:
+            self.user_stats['cache_hits'] += 1
+            return None if cached is NEGATIVE else cached
+
+        bloom = self.user_emails
+        bloom_miss = bloom is not None and email not in bloom
+        if bloom_miss:
+            self.user_stats['bloom_misses'] += 1
+
+        self.user_stats['queries'] += 1
+        self._refresh_user_emails()
         result = self.get_table('users').select('*').eq('email', email).execute()
-        return result.data[0] if result.data else None
+        if not result.data:
+            self.users.set(f"email:{email}", NEGATIVE, ttl=Config.USER_NEGATIVE_TTL)
+            return None
+        if bloom_miss:
+            # The filter is out of date: rebuild it now rather than at the next USER_BLOOM_REFRESH
+            self.user_stats['bloom_stale'] += 1
+            with self._user_emails_lock:
+                self.user_emails_loaded_at = 0
+            self._refresh_user_emails()
+        self._cache_user(result.data[0])
+        return result.data[0]
     
     def get_user(self, user_id):
+        cached = self.users.get(f"id:{user_id}")
+        if cached is not None:
+            self.user_stats['cache_hits'] += 1
+            return None if cached is NEGATIVE else cached
+
+        self.user_stats['queries'] += 1
         result = self.get_table('users').select('*').eq('id', user_id).execute()
-        return result.data[0] if result.data else None
+        if not result.data:
+            self.users.set(f"id:{user_id}", NEGATIVE, ttl=Config.USER_NEGATIVE_TTL)
+            return None
+        self._cache_user(result.data[0])
+        return result.data[0]
+
+    def update_user(self, user_id, update_data):
+        """Update a user's profile and refresh the cached record"""
+        # Invalidate first: the cached row still has the old email
+        self.invalidate_user(user_id)
+        result = self.get_table('users').update(update_data).eq('id', user_id).execute()
+        for user in result.data or []:
+            self._cache_user(user)
+        invalidation_bus.publish('users', [user_id])
+        return result
+
+    def _on_users_invalidated(self, user_ids):
+        """Users registered or updated by another worker: drop stale entries, learn new emails"""
+        for user_id in user_ids:
+            self.invalidate_user(user_id)
+        for user in self.get_table('users').select('*').in_('id', user_ids).execute().data or []:
+            # A negative entry may still be cached for an email that was just registered
+            self.users.delete(f"email:{user.get('email')}")
+            self._cache_user(user)
+
+    # Revoked session tokens (logouts), kept until the token would have expired
+    def save_revoked_token(self, token_id, expires_at):
+        table = self.get_table('revoked_tokens')
+        if not table:
+            return None
+        # Drop revocations of tokens that have expired since
+        self.get_table('revoked_tokens').delete().lt('expires_at', time.time()).execute()
+        return table.insert({'jti': token_id, 'expires_at': expires_at}).execute()
+
+    def get_revoked_tokens(self):
+        """(token id, expiry) pairs of revoked tokens that haven't expired yet"""
+        table = self.get_table('revoked_tokens')
+        if not table:
+            return []
+        rows = table.select('jti,expires_at').gt('expires_at', time.time()).execute().data or []
+        return [(row['jti'], row['expires_at']) for row in rows]
+
+    def user_cache_stats(self):
+        return {
+            **dict(self.user_stats),
+            'cache': self.users.stats(),
+            'bloom_size': len(self.user_emails) if self.user_emails is not None else None
+        }
     
     # Service operations
     def search_services(self, query, filters):
+        if not self.search_index.ready and not self.build_search_index():
+            return self._search_services_remote(query, filters)
+        return self.search_index.search(query, filters)
+
+    def rank_services(self, query, filters, limit, offset=0, location=None, sort=None):
+        """
+        Return (page of rows, total matches), ranked by BM25 relevance
+        blended with rating and distance from location (lat, lng).
+        filters['distance'] (km) limits results to that radius around location;
+        sort='distance' orders by distance instead of relevance.
+        """
+        if not self.search_index.ready and not self.build_search_index():
+            rows = self._search_services_remote(query, filters, limit, offset)
+            return rows, offset + len(rows)
+        if not location:
+            return self.search_index.rank(query, filters, limit, offset)
+
+        radius = None
+        try:
+            if filters.get('distance'):
+                radius = float(filters['distance']) * 1000
+        except (TypeError, ValueError):
+            pass
+        ids, meters = self.spatial_index.within(location, radius)
+        ids = ids.tolist()
+        distances = dict(zip(ids, meters.tolist()))
+        if sort == 'distance':
+            return self.search_index.rank_by_order(query, filters, ids, limit, offset, distances)
+        return self.search_index.rank(query, filters, limit, offset, distances, restrict=radius is not None)
+
+    def _search_services_remote(self, query, filters, limit=None, offset=0):
+        """ilike search against Supabase, used only when the index can't be built"""
         table = self.get_table('services')
         if not table:
             return []
@@ -48,37 +344,45 @@ class SupabaseService:
         
         if filters.get('category'):
             query_builder = query_builder.eq('category', filters['category'])
+
+        if limit is not None:
+            query_builder = query_builder.range(offset, offset + limit - 1)
         
         try:
             result = query_builder.execute()
             return result.data
-        except:
-            # Fallback: get all and filter in Python
-            try:
-                result = table.select('*').execute()
-                services = result.data
-                if query:
-                    query_lower = query.lower()
-                    services = [s for s in services if query_lower in s.get('name', '').lower() or query_lower in s.get('description', '').lower()]
-                if filters.get('category'):
-                    services = [s for s in services if s.get('category') == filters['category']]
-                return services
-            except:
-                return []
-    
-    def get_service(self, service_id):
-        result = self.get_table('services').select('*').eq('id', service_id).execute()
+        except Exception as e:
+            print(f"Service search error: {e}")
+            return []
+    
+    def get_service(self, service_id, columns='*'):
+        if self.mirror.fresh('services'):
+            return self.mirror.get('services', service_id, columns)
+        result = self.get_table('services').select(columns).eq('id', service_id).execute()
         return result.data[0] if result.data else None
     
-    def get_service_masters(self, service_id):
-        result = self.get_table('masters').select('*').eq('service_id', service_id).execute()
+    def get_service_duration(self, service_id):
+        """Service duration in minutes (60 if unknown)"""
+        service = self.search_index.docs.get(service_id)
+        if service is None and service_id is not None and self.db:
+            service = self.get_service(service_id)
+        try:
+            return int((service or {}).get('duration') or 60)
+        except (TypeError, ValueError):
+            return 60
+
+    def get_service_masters(self, service_id, columns='*'):
+        if self.mirror.fresh('masters'):
+            return self.mirror.find('masters', 'service_id', service_id, columns)
+        result = self.get_table('masters').select(columns).eq('service_id', service_id).execute()
         return result.data
     
-    def get_service_reviews(self, service_id):
-        result = self.get_table('reviews').select('*').eq('service_id', service_id).execute()
-        return result.data
+    def get_service_reviews(self, service_id, limit=None, after=None):
+        return self._keyset_page('reviews', 'service_id', service_id, limit, after)
     
     def get_service_examples(self, service_id):
+        if self.mirror.fresh('work_examples'):
+            return self.mirror.find('work_examples', 'service_id', service_id)
         result = self.get_table('work_examples').select('*').eq('service_id', service_id).execute()
         return result.data
     
@@ -86,9 +390,23 @@ class SupabaseService:
     def create_booking(self, booking_data):
         return self.get_table('bookings').insert(booking_data).execute()
     
-    def get_user_bookings(self, user_id):
-        result = self.get_table('bookings').select('*').eq('client_id', user_id).execute()
+    def get_master_bookings(self, master_id, date_from):
+        """Bookings of a master from date_from ('YYYY-MM-DD') onwards"""
+        table = self.get_table('bookings')
+        if not table:
+            return []
+        result = table.select('*').eq('master_id', master_id).gte('date', date_from).execute()
         return result.data
+
+    def get_bookings(self, booking_ids):
+        return self.get_table('bookings').select('*').in_('id', booking_ids).execute().data or []
+
+    def get_booking(self, booking_id):
+        result = self.get_table('bookings').select('*').eq('id', booking_id).execute()
+        return result.data[0] if result.data else None
+
+    def get_user_bookings(self, user_id, limit=None, after=None, columns='*'):
+        return self._keyset_page('bookings', 'client_id', user_id, limit, after, columns)
     
     def update_booking(self, booking_id, update_data):
         return self.get_table('bookings').update(update_data).eq('id', booking_id).execute()
@@ -106,9 +424,8 @@ class SupabaseService:
     def remove_favorite(self, client_id, service_id):
         return self.get_table('favorites').delete().eq('client_id', client_id).eq('service_id', service_id).execute()
     
-    def get_favorites(self, client_id):
-        result = self.get_table('favorites').select('*').eq('client_id', client_id).execute()
-        return result.data
+    def get_favorites(self, client_id, limit=None, after=None, columns='*'):
+        return self._keyset_page('favorites', 'client_id', client_id, limit, after, columns)
     
     # Company operations
     def create_company(self, user_id, email):
@@ -116,30 +433,50 @@ class SupabaseService:
         table = self.get_table('companies')
         if not table:
             return None
-        return table.insert({
+        return self._mirror_write('companies', table.insert({
             'user_id': user_id,
             'name': email.split('@')[0],  # Default name from email
             'email': email,
-        }).execute()
+        }).execute())
     
     def get_company_by_user_id(self, user_id):
         """Get company by user ID"""
+        if self.mirror.fresh('companies'):
+            companies = self.mirror.find('companies', 'user_id', user_id)
+            return companies[0] if companies else None
         table = self.get_table('companies')
         if not table:
             return None
         result = table.select('*').eq('user_id', user_id).execute()
         return result.data[0] if result.data else None
     
-    def get_company_settings(self, company_id):
-        result = self.get_table('companies').select('*').eq('id', company_id).execute()
+    def get_company_settings(self, company_id, columns='*'):
+        if self.mirror.fresh('companies'):
+            return self.mirror.get('companies', company_id, columns)
+        result = self.get_table('companies').select(columns).eq('id', company_id).execute()
         return result.data[0] if result.data else None
     
     def update_company_settings(self, company_id, settings):
-        return self.get_table('companies').update(settings).eq('id', company_id).execute()
+        result = self._mirror_write('companies', self.get_table('companies').update(settings).eq('id', company_id).execute())
+        for company in result.data or []:
+            self._update_company_location(company)
+        return result
+
+    def _update_company_location(self, company):
+        """Move services that inherit a company's coordinates along with it"""
+        coords = row_coordinates(company)
+        if coords:
+            self.company_locations[company['id']] = coords
+        else:
+            self.company_locations.pop(company['id'], None)
+        for row in list(self.search_index.docs.values()):
+            if row.get('company_id') == company['id']:
+                self.spatial_index.add(row['id'], self._service_coordinates(row))
     
-    def get_company_masters(self, company_id):
-        result = self.get_table('masters').select('*').eq('company_id', company_id).execute()
-        return result.data
+    def get_company_masters(self, company_id, limit=None, after=None, columns='*'):
+        if self.mirror.fresh('masters'):
+            return self.mirror.page('masters', 'company_id', company_id, limit, after, columns)
+        return self._keyset_page('masters', 'company_id', company_id, limit, after, columns)
     
     # Service operations for companies
     def create_service(self, service_data):
@@ -147,38 +484,74 @@ class SupabaseService:
         table = self.get_table('services')
         if not table:
             return None
-        return table.insert(service_data).execute()
+        result = self._mirror_write('services', table.insert(service_data).execute())
+        for row in result.data or []:
+            self._index_service(row)
+        return result
     
-    def get_company_services(self, company_id):
-        """Get all services for a company"""
-        table = self.get_table('services')
-        if not table:
-            return []
-        result = table.select('*').eq('company_id', company_id).execute()
-        return result.data
+    def get_company_services(self, company_id, limit=None, after=None, columns='*'):
+        """Get a page of a company's services"""
+        if self.mirror.fresh('services'):
+            return self.mirror.page('services', 'company_id', company_id, limit, after, columns)
+        return self._keyset_page('services', 'company_id', company_id, limit, after, columns)
     
     def update_service(self, service_id, service_data):
         """Update a service"""
         table = self.get_table('services')
         if not table:
             return None
-        return table.update(service_data).eq('id', service_id).execute()
+        result = self._mirror_write('services', table.update(service_data).eq('id', service_id).execute())
+        for row in result.data or []:
+            self._index_service(row)
+        return result
     
     def delete_service(self, service_id):
         """Delete a service"""
         table = self.get_table('services')
         if not table:
             return None
-        return table.delete().eq('id', service_id).execute()
+        result = table.delete().eq('id', service_id).execute()
+        self.mirror.remove('services', service_id)
+        self.search_index.remove(service_id)
+        self.spatial_index.remove(service_id)
+        invalidation_bus.publish('services', [service_id])
+        return result
     
+    def get_master(self, master_id):
+        if self.mirror.fresh('masters'):
+            return self.mirror.get('masters', master_id)
+        result = self.get_table('masters').select('*').eq('id', master_id).execute()
+        return result.data[0] if result.data else None
+
     def create_master(self, master_data):
-        return self.get_table('masters').insert(master_data).execute()
+        return self._mirror_write('masters', self.get_table('masters').insert(master_data).execute())
     
     def update_master(self, master_id, master_data):
-        return self.get_table('masters').update(master_data).eq('id', master_id).execute()
+        return self._mirror_write('masters', self.get_table('masters').update(master_data).eq('id', master_id).execute())
     
     def delete_master(self, master_id):
-        return self.get_table('masters').delete().eq('id', master_id).execute()
+        return self._mirror_delete('masters', self.get_table('masters').delete().eq('id', master_id).execute())
+
+    # Promotions
+    def get_company_promotions(self, company_id, limit=None, after=None):
+        if self.mirror.fresh('promotions'):
+            return self.mirror.page('promotions', 'company_id', company_id, limit, after)
+        return self._keyset_page('promotions', 'company_id', company_id, limit, after)
+
+    def get_promotion(self, promotion_id):
+        if self.mirror.fresh('promotions'):
+            return self.mirror.get('promotions', promotion_id)
+        result = self.get_table('promotions').select('*').eq('id', promotion_id).execute()
+        return result.data[0] if result.data else None
+
+    def create_promotion(self, promotion_data):
+        return self._mirror_write('promotions', self.get_table('promotions').insert(promotion_data).execute())
+
+    def delete_promotion(self, promotion_id):
+        return self._mirror_delete('promotions', self.get_table('promotions').delete().eq('id', promotion_id).execute())
+
+    def catalogue_stats(self):
+        return self.mirror.stats()
 
 # Create global instance
 supabase_service = SupabaseService()
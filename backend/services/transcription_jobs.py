@@ -0,0 +1,113 @@
+# Background transcription jobs
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from config import Config
+from services.voice_service import voice_service
+
+JOB_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+class QueueFullError(RuntimeError):
+    """Raised when too many transcription jobs are already waiting"""
+
+
+class TranscriptionJobs:
+    """
+    Uploads are spooled to disk and transcribed by a bounded worker pool.
+
+    Job state lives in <spool>/<job_id>.json so that any gunicorn worker can
+    answer status polls, not only the one that accepted the upload.
+    """
+
+    def __init__(self):
+        self.spool_dir = Config.VOICE_SPOOL_DIR
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self.executor = ThreadPoolExecutor(max_workers=Config.VOICE_WORKERS, thread_name_prefix='transcribe')
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    def _path(self, job_id, suffix):
+        return os.path.join(self.spool_dir, f"{job_id}.{suffix}")
+
+    def _write_state(self, job_id, state):
+        # Write-then-rename so readers never see a half-written file
+        tmp = self._path(job_id, 'json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, self._path(job_id, 'json'))
+
+    def get(self, job_id):
+        """Current job state, or None for unknown ids"""
+        if not JOB_ID_RE.match(job_id or ''):
+            return None
+        try:
+            with open(self._path(job_id, 'json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def submit(self, audio_file, audio_key=None):
+        """Spool an uploaded file and queue it; returns the job state"""
+        with self._lock:
+            if self._pending >= Config.VOICE_MAX_PENDING:
+                raise QueueFullError('Too many transcriptions in progress')
+            self._pending += 1
+
+        job_id = uuid.uuid4().hex
+        try:
+            audio_file.save(self._path(job_id, 'audio'))
+            state = {
+                'id': job_id,
+                'status': 'queued',
+                'filename': audio_file.filename or 'audio',
+                'mimetype': audio_file.mimetype or 'application/octet-stream',
+                'audio_key': audio_key,
+                'created_at': time.time(),
+            }
+            self._write_state(job_id, state)
+            self.executor.submit(self._run, job_id, state)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+
+        self.purge_expired()
+        return state
+
+    def _run(self, job_id, state):
+        audio_path = self._path(job_id, 'audio')
+        try:
+            self._write_state(job_id, {**state, 'status': 'processing'})
+            with open(audio_path, 'rb') as f:
+                text = voice_service.transcribe(f, state['filename'], state['mimetype'], key=state.get('audio_key'))
+            self._write_state(job_id, {**state, 'status': 'done', 'text': text, 'finished_at': time.time()})
+        except Exception as e:
+            print(f"Transcription job {job_id} failed: {e}")
+            self._write_state(job_id, {**state, 'status': 'failed', 'error': str(e), 'finished_at': time.time()})
+        finally:
+            with self._lock:
+                self._pending -= 1
+            try:
+                os.remove(audio_path)
+            except OSError:
+                pass
+
+    def purge_expired(self):
+        """Remove job files older than VOICE_JOB_TTL"""
+        cutoff = time.time() - Config.VOICE_JOB_TTL
+        try:
+            for name in os.listdir(self.spool_dir):
+                path = os.path.join(self.spool_dir, name)
+                if name.endswith('.json') and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+        except OSError:
+            pass
+
+# Create global instance
+transcription_jobs = TranscriptionJobs()
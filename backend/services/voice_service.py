@@ -1,33 +1,79 @@
-import requests
-from backend.config import Config
+import hashlib
+
+from config import Config
+from utils.audio import normalize_audio
+from utils.cache import TieredCache
+from utils.http_client import get_provider
+
+# Bytes read at a time when hashing uploads
+HASH_CHUNK_SIZE = 64 * 1024
 
 
 class VoiceService:
     def __init__(self):
         self.api_key = Config.ELEVENLABS_API_KEY
         self.base_url = "https://api.elevenlabs.io/v1/speech-to-text"
+        self.http = get_provider('elevenlabs')
+        self.model_id = "scribe_v2"
+        self.language = "auto"  # або "ru", "uk", "en"
+        # Resent recordings (e.g. network retries) are answered from here
+        self.cache = TieredCache(
+            path=Config.VOICE_CACHE_PATH,
+            max_size=256,
+            ttl=Config.VOICE_CACHE_TTL,
+            disk_max_entries=Config.VOICE_CACHE_MAX_ENTRIES
+        )
 
-    def transcribe_audio(self, audio_file):
+    def audio_key(self, stream):
+        """Cache key: streaming SHA-256 of the audio bytes plus model and language"""
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: stream.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+        stream.seek(0)
+        return f"{digest.hexdigest()}:{self.model_id}:{self.language}"
+
+    def transcribe_audio(self, audio_file, key=None):
+        """
+        Transcribe an uploaded audio file (werkzeug FileStorage); pass the
+        audio_key when it is already known to avoid hashing the upload again
+        """
+        return self.transcribe(audio_file.stream, audio_file.filename, audio_file.mimetype, key)
+
+    def transcribe(self, stream, filename, mimetype, key=None):
         """
         Transcribe audio using ElevenLabs Scribe v2
         """
+        key = key or self.audio_key(stream)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
         if not self.api_key:
             raise RuntimeError("ELEVENLABS_API_KEY is missing")
 
+        if Config.VOICE_NORMALIZE:
+            normalized = normalize_audio(stream, filename, mimetype)
+            if normalized is None:
+                # Nothing but silence: no need to ask upstream
+                self.cache.set(key, "")
+                return ""
+            stream, filename, mimetype = normalized
+
         headers = {
             "xi-api-key": self.api_key
         }
 
         files = {
-            "file": (audio_file.filename, audio_file, audio_file.mimetype)
+            "file": (filename, stream, mimetype)
         }
 
         data = {
-            "model_id": "scribe_v2",
-            "language": "auto"  # або "ru", "uk", "en"
+            "model_id": self.model_id,
+            "language": self.language
         }
 
-        response = requests.post(
+        response = self.http.request(
+            'POST',
             self.base_url,
             headers=headers,
             files=files,
@@ -40,7 +86,10 @@ class VoiceService:
 
         result = response.json()
 
-        return result.get("text")
+        text = result.get("text")
+        if text is not None:
+            self.cache.set(key, text)
+        return text
 
 
 # global instance
@@ -0,0 +1,137 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from config import Config
+from utils.http_client import CircuitBreaker, Provider, ProviderUnavailableError, SimulatedUpstream
+
+URL = 'https://upstream.test/v1'
+RESET = 0.1
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(Config, 'HTTP_BACKOFF_BASE', 0)
+
+
+def make_provider(upstream, retries=0, max_concurrency=4):
+    provider = Provider('test', max_concurrency, timeout=5, retries=retries)
+    provider.breaker = CircuitBreaker(threshold=3, reset_timeout=RESET)
+    provider.mount(upstream)
+    return provider
+
+
+def open_circuit(provider):
+    for _ in range(provider.breaker.threshold):
+        with pytest.raises(requests.HTTPError):
+            provider.request('GET', URL)
+    assert provider.breaker.state == 'open'
+
+
+def test_circuit_opens_after_threshold_and_fails_fast():
+    upstream = SimulatedUpstream(failure_rate=1.0)
+    provider = make_provider(upstream)
+
+    open_circuit(provider)
+    with pytest.raises(ProviderUnavailableError):
+        provider.request('GET', URL)
+    assert upstream.calls == 3
+
+
+def test_retries_count_as_one_failure():
+    upstream = SimulatedUpstream(failure_rate=1.0, failure_status=None)
+    provider = make_provider(upstream, retries=2)
+
+    with pytest.raises(requests.ConnectionError):
+        provider.request('GET', URL)
+    assert upstream.calls == 3
+    assert provider.breaker.failures == 1
+    assert provider.breaker.state == 'closed'
+
+
+def test_half_open_lets_a_single_trial_through():
+    upstream = SimulatedUpstream(failure_rate=1.0)
+    provider = make_provider(upstream)
+    open_circuit(provider)
+    time.sleep(RESET)
+    assert provider.breaker.state == 'half-open'
+
+    upstream.failure_rate = 0.0
+    upstream.latency = 0.2
+    results = []
+    trial = threading.Thread(target=lambda: results.append(provider.request('GET', URL).status_code))
+    trial.start()
+    time.sleep(0.05)
+    # The trial is in flight: everyone else still fails fast
+    with pytest.raises(ProviderUnavailableError):
+        provider.request('GET', URL)
+    trial.join()
+
+    assert results == [200]
+    assert upstream.calls == 4
+    assert provider.breaker.state == 'closed'
+
+
+def test_failed_trial_reopens_the_circuit():
+    upstream = SimulatedUpstream(failure_rate=1.0)
+    provider = make_provider(upstream)
+    open_circuit(provider)
+    time.sleep(RESET)
+
+    with pytest.raises(requests.HTTPError):
+        provider.request('GET', URL)
+    assert provider.breaker.state == 'open'
+    with pytest.raises(ProviderUnavailableError):
+        provider.request('GET', URL)
+    assert upstream.calls == 4
+
+
+def test_recovers_after_successful_trial():
+    upstream = SimulatedUpstream(failure_rate=1.0)
+    provider = make_provider(upstream)
+    open_circuit(provider)
+    time.sleep(RESET)
+
+    upstream.failure_rate = 0.0
+    for _ in range(5):
+        assert provider.request('GET', URL).status_code == 200
+    assert provider.stats() == {'circuit': 'closed', 'consecutive_failures': 0}
+
+
+def test_non_retryable_error_frees_the_trial():
+    upstream = SimulatedUpstream(failure_rate=1.0)
+    provider = make_provider(upstream)
+    open_circuit(provider)
+    time.sleep(RESET)
+
+    def bad_request():
+        raise ValueError('rejected by the SDK before reaching the upstream')
+
+    with pytest.raises(ValueError):
+        provider.call(bad_request, retry_on=(requests.HTTPError,))
+    # Neither success nor failure was recorded, so the next call is the trial
+    assert provider.breaker.state == 'half-open'
+    upstream.failure_rate = 0.0
+    assert provider.request('GET', URL).status_code == 200
+    assert provider.breaker.state == 'closed'
+
+
+def test_slot_timeout_does_not_claim_the_trial(monkeypatch):
+    monkeypatch.setattr(Config, 'HTTP_ACQUIRE_TIMEOUT', 0.01)
+    upstream = SimulatedUpstream(failure_rate=1.0)
+    provider = make_provider(upstream, max_concurrency=1)
+    open_circuit(provider)
+    time.sleep(RESET)
+
+    provider._slots.acquire()
+    try:
+        with pytest.raises(ProviderUnavailableError, match='concurrency limit'):
+            provider.request('GET', URL)
+    finally:
+        provider._slots.release()
+
+    upstream.failure_rate = 0.0
+    assert provider.request('GET', URL).status_code == 200
+    assert provider.breaker.state == 'closed'
@@ -0,0 +1,306 @@
+# Audio normalization before speech-to-text upload
+import io
+import shutil
+import subprocess
+import threading
+import wave
+
+import numpy as np
+
+from config import Config
+
+# Source frames decoded per step; keeps peak memory independent of clip length
+CHUNK_FRAMES = 32 * 1024
+# Energy is measured over 20 ms windows
+WINDOW_SECONDS = 0.02
+# Silence kept around speech so words aren't clipped
+PAD_SECONDS = 0.2
+
+_SAMPLE_DTYPES = {1: '<u1', 2: '<i2', 4: '<i4'}
+
+FFMPEG = shutil.which('ffmpeg')
+
+# Encoder -> (ffmpeg format, file extension, mime type) of the normalized upload
+ENCODINGS = {
+    'libopus': ('ogg', 'ogg', 'audio/ogg'),
+    'flac': ('flac', 'flac', 'audio/flac'),
+}
+
+
+class AudioRejectedError(ValueError):
+    """Raised when an upload exceeds the size or duration limits"""
+
+
+def _is_wav(stream):
+    header = stream.read(12)
+    stream.seek(0)
+    return header[:4] == b'RIFF' and header[8:12] == b'WAVE'
+
+
+def _to_float(raw, sample_width, channels):
+    """PCM bytes -> mono float32 samples in [-1, 1]"""
+    samples = np.frombuffer(raw, dtype=_SAMPLE_DTYPES[sample_width]).astype(np.float32)
+    if sample_width == 1:
+        samples = (samples - 128.0) / 128.0
+    else:
+        samples /= float(2 ** (8 * sample_width - 1))
+    if channels > 1:
+        samples = samples[:len(samples) - len(samples) % channels].reshape(-1, channels).mean(axis=1)
+    return samples
+
+
+class _Resampler:
+    """Streaming resampler: boxcar low-pass, then linear interpolation"""
+
+    def __init__(self, source_rate, target_rate):
+        self.step = source_rate / target_rate
+        self.taps = max(int(round(self.step)), 1)
+        self._history = np.zeros(self.taps - 1, dtype=np.float32)
+        self._tail = np.zeros(0, dtype=np.float32)
+        self._position = 0.0
+
+    def process(self, samples):
+        if self.step == 1:
+            return samples
+        if self.taps > 1:
+            # Average over one output period to keep aliasing out of the band
+            padded = np.concatenate([self._history, samples])
+            self._history = padded[len(padded) - (self.taps - 1):]
+            samples = np.convolve(padded, np.full(self.taps, 1.0 / self.taps, dtype=np.float32), mode='valid')
+        buffer = np.concatenate([self._tail, samples])
+        if len(buffer) < 2:
+            self._tail = buffer
+            return np.zeros(0, dtype=np.float32)
+        positions = np.arange(self._position, len(buffer) - 1, self.step)
+        resampled = np.interp(positions, np.arange(len(buffer)), buffer).astype(np.float32)
+        # Carry the last sample and the fractional offset into the next chunk
+        next_position = positions[-1] + self.step if len(positions) else self._position
+        self._position = next_position - (len(buffer) - 1)
+        self._tail = buffer[-1:]
+        return resampled
+
+
+class _SilenceTrimmer:
+    """
+    Drops leading and trailing windows whose RMS energy is under the threshold.
+    Quiet windows after speech are held back until more speech arrives.
+    """
+
+    def __init__(self, rate, threshold, max_samples):
+        self.window = int(rate * WINDOW_SECONDS)
+        self.pad = int(rate * PAD_SECONDS) // self.window
+        self.threshold = threshold
+        self.max_samples = max_samples
+        self._partial = np.zeros(0, dtype=np.float32)
+        self._held = []  # quiet windows since the last voiced one
+        self.started = False
+        self.written = 0
+
+    def process(self, samples, sink):
+        buffer = np.concatenate([self._partial, samples])
+        usable = len(buffer) - len(buffer) % self.window
+        self._partial = buffer[usable:]
+        if not usable:
+            return
+        windows = buffer[:usable].reshape(-1, self.window)
+        voiced = np.sqrt(np.mean(windows * windows, axis=1)) >= self.threshold
+
+        start = 0
+        for index in np.flatnonzero(voiced):
+            quiet = windows[start:index]
+            if self.started:
+                self._held.extend(quiet)
+                self._emit(self._held, sink)
+            else:
+                # Leading silence: keep only the padding right before speech
+                self._emit((self._held + list(quiet))[-self.pad:] if self.pad else [], sink)
+                self.started = True
+            self._held = []
+            self._emit([windows[index]], sink)
+            start = index + 1
+
+        quiet = windows[start:]
+        if self.started:
+            self._held.extend(quiet)
+        elif self.pad:
+            self._held = (self._held + list(quiet))[-self.pad:]
+
+    def finish(self, sink):
+        if self.started:
+            self._emit(self._held[:self.pad], sink)
+
+    def _emit(self, windows, sink):
+        if not windows:
+            return
+        chunk = np.concatenate(windows)
+        self.written += len(chunk)
+        if self.written > self.max_samples:
+            raise AudioRejectedError(f"Recording is longer than {Config.VOICE_MAX_SECONDS} seconds")
+        sink(chunk)
+
+
+class _DecodeError(RuntimeError):
+    pass
+
+
+def _stream_size(stream):
+    stream.seek(0, 2)
+    size = stream.tell()
+    stream.seek(0)
+    return size
+
+
+def _wav_source(stream):
+    """(sample rate, chunk iterator) for a PCM WAV stream"""
+    wav = wave.open(stream, 'rb')
+    width, channels, rate = wav.getsampwidth(), wav.getnchannels(), wav.getframerate()
+    if width not in _SAMPLE_DTYPES:
+        raise _DecodeError(f"Unsupported sample width: {width}")
+
+    def chunks():
+        while True:
+            raw = wav.readframes(CHUNK_FRAMES)
+            if not raw:
+                return
+            yield _to_float(raw, width, channels)
+
+    return rate, chunks()
+
+
+def _ffmpeg_source(stream, rate):
+    """(sample rate, chunk iterator) decoding any container through ffmpeg"""
+    process = subprocess.Popen(
+        [FFMPEG, '-v', 'error', '-i', 'pipe:0', '-ac', '1', '-ar', str(rate), '-f', 's16le', 'pipe:1'],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+
+    def feed():
+        # Written from a thread so a full stdout pipe can't deadlock us
+        try:
+            for block in iter(lambda: stream.read(CHUNK_FRAMES), b''):
+                process.stdin.write(block)
+        except (BrokenPipeError, ValueError):
+            pass
+        finally:
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+
+    def chunks():
+        feeder = threading.Thread(target=feed, daemon=True)
+        feeder.start()
+        try:
+            for raw in iter(lambda: process.stdout.read(CHUNK_FRAMES * 2), b''):
+                yield _to_float(raw, 2, 1)
+            if process.wait() != 0:
+                raise _DecodeError(f"ffmpeg exited with {process.returncode}")
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            feeder.join()
+            process.stdout.close()
+
+    return rate, chunks()
+
+
+def _encode(pcm, rate):
+    """Compress mono 16-bit PCM with VOICE_ENCODE_CODEC through ffmpeg; returns (bytes, extension, mime)"""
+    codec = Config.VOICE_ENCODE_CODEC
+    container, extension, mimetype = ENCODINGS.get(codec, ENCODINGS['flac'])
+    command = [FFMPEG, '-v', 'error', '-f', 's16le', '-ar', str(rate), '-ac', '1', '-i', 'pipe:0',
+               '-c:a', codec if codec in ENCODINGS else 'flac']
+    if codec == 'libopus':
+        command += ['-b:a', Config.VOICE_ENCODE_BITRATE, '-application', 'voip']
+    command += ['-f', container, 'pipe:1']
+    try:
+        result = subprocess.run(command, input=pcm, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                timeout=60, check=True)
+    except subprocess.CalledProcessError as e:
+        raise _DecodeError(f"ffmpeg could not encode {codec}: {e.stderr.decode(errors='replace').strip()}")
+    except subprocess.TimeoutExpired:
+        raise _DecodeError(f"ffmpeg timed out encoding {codec}")
+    return result.stdout, extension, mimetype
+
+
+def _wav_bytes(pcm, rate):
+    out = io.BytesIO()
+    with wave.open(out, 'wb') as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(rate)
+        writer.writeframes(pcm)
+    return out.getvalue()
+
+
+def normalize_audio(stream, filename, mimetype):
+    """
+    Downmix to mono, resample to VOICE_SAMPLE_RATE and trim leading/trailing
+    silence, streaming chunk by chunk, then compress the result with
+    VOICE_ENCODE_CODEC (Opus by default).
+
+    Browser recordings (webm / ogg / mp4) need ffmpeg both to decode and to
+    encode; without it only WAV uploads are normalized, into a 16-bit WAV.
+    The original upload is kept when it can't be decoded or is smaller than
+    the normalized file.
+
+    Returns:
+        (stream, filename, mimetype) to upload, or None when the clip is silent
+
+    Raises:
+        AudioRejectedError: the upload is over VOICE_MAX_UPLOAD_BYTES or its
+        speech is longer than VOICE_MAX_SECONDS
+    """
+    size = _stream_size(stream)
+    if size > Config.VOICE_MAX_UPLOAD_BYTES:
+        raise AudioRejectedError(f"Recording is larger than {Config.VOICE_MAX_UPLOAD_BYTES} bytes")
+
+    rate = Config.VOICE_SAMPLE_RATE
+    try:
+        if _is_wav(stream):
+            source_rate, chunks = _wav_source(stream)
+        elif FFMPEG:
+            source_rate, chunks = _ffmpeg_source(stream, rate)
+        else:
+            return stream, filename, mimetype
+    except (wave.Error, EOFError, _DecodeError) as e:
+        print(f"Warning: could not decode {filename}: {e}")
+        stream.seek(0)
+        return stream, filename, mimetype
+
+    # At most VOICE_MAX_SECONDS of 16-bit mono: a few MB
+    pcm = io.BytesIO()
+
+    def sink(samples):
+        pcm.write((np.clip(samples, -1.0, 1.0) * 32767).astype('<i2').tobytes())
+
+    resampler = _Resampler(source_rate, rate)
+    trimmer = _SilenceTrimmer(rate, Config.VOICE_SILENCE_THRESHOLD, Config.VOICE_MAX_SECONDS * rate)
+    try:
+        for samples in chunks:
+            trimmer.process(resampler.process(samples), sink)
+        trimmer.finish(sink)
+    except (wave.Error, EOFError, OSError, _DecodeError) as e:
+        print(f"Warning: could not decode {filename}: {e}")
+        stream.seek(0)
+        return stream, filename, mimetype
+
+    if not trimmer.started:
+        return None
+
+    encoded = None
+    if FFMPEG:
+        try:
+            encoded = _encode(pcm.getvalue(), rate)
+        except (OSError, _DecodeError) as e:
+            print(f"Warning: could not encode {filename}: {e}")
+    if encoded is None:
+        encoded = _wav_bytes(pcm.getvalue(), rate), 'wav', 'audio/wav'
+    data, extension, encoded_type = encoded
+    if len(data) >= size:
+        stream.seek(0)
+        return stream, filename, mimetype
+
+    stem = (filename or 'audio').rsplit('.', 1)[0]
+    return io.BytesIO(data), f"{stem}.{extension}", encoded_type
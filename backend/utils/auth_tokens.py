@@ -0,0 +1,200 @@
+# Signed session tokens
+import base64
+import functools
+import hashlib
+import hmac
+import json
+import secrets
+import threading
+import time
+
+from flask import current_app, g, jsonify, request
+
+from config import Config
+from utils.cache import TTLCache
+from utils.concurrency import executor
+from utils.invalidation import invalidation_bus
+
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+class AuthTokens:
+    """
+    Stateless tokens: base64(claims) + '.' + base64(HMAC-SHA256(claims)).
+    Claims carry the user id, user type, company id (company users) and
+    expiry. Verification needs no database: recently verified tokens are
+    kept in an LRU and logged-out tokens in an in-memory revocation set
+    until they would have expired anyway. Logouts are stored in the
+    revoked_tokens table, so the set survives restarts and reaches other
+    hosts (re-read every TOKEN_REVOCATION_REFRESH seconds), and are
+    published on the invalidation bus for the other workers on this host.
+    """
+
+    def __init__(self, secret=None, ttl=None):
+        secret = secret or Config.SECRET_KEY
+        if secret == Config.DEFAULT_SECRET_KEY and not Config.DEBUG:
+            print("WARNING: SECRET_KEY is not set. Session tokens are signed with the public default key "
+                  "and can be forged. Set SECRET_KEY before running in production.")
+        self.secret = secret.encode()
+        self.ttl = ttl or Config.TOKEN_TTL
+        self.verified = TTLCache(max_size=Config.TOKEN_CACHE_SIZE, ttl=Config.TOKEN_CACHE_TTL)
+        self._revoked = {}  # token id -> expiry
+        self._revoked_loaded_at = None
+        self._revoked_loading = False
+        self._lock = threading.Lock()
+        invalidation_bus.subscribe('tokens', self._on_revoked)
+
+    def _sign(self, payload):
+        return _b64encode(hmac.new(self.secret, payload.encode(), hashlib.sha256).digest())
+
+    def issue(self, user_id, user_type, company_id=None):
+        """New token for a user; company users also carry their company id"""
+        claims = {
+            'uid': user_id,
+            'typ': user_type,
+            'exp': int(time.time()) + self.ttl,
+            'jti': secrets.token_urlsafe(8),
+        }
+        if company_id is not None:
+            claims['cid'] = company_id
+        payload = _b64encode(json.dumps(claims, separators=(',', ':')).encode())
+        return f"{payload}.{self._sign(payload)}"
+
+    def verify(self, token):
+        """Claims of a valid, unexpired, unrevoked token, or None"""
+        if not token:
+            return None
+        claims = self.verified.get(token)
+        if claims is None:
+            claims = self._decode(token)
+            if claims is None:
+                return None
+            self.verified.set(token, claims)
+        self._refresh_revoked()
+        if claims['exp'] < time.time() or claims['jti'] in self._revoked:
+            return None
+        return claims
+
+    def _decode(self, token):
+        payload, _, signature = token.partition('.')
+        # Compare bytes: compare_digest rejects str with non-ASCII characters
+        if not signature or not hmac.compare_digest(signature.encode(), self._sign(payload).encode()):
+            return None
+        try:
+            claims = json.loads(_b64decode(payload))
+        except ValueError:
+            return None
+        if not isinstance(claims, dict) or not {'uid', 'typ', 'exp', 'jti'} <= claims.keys():
+            return None
+        return claims
+
+    def revoke(self, token):
+        """Reject a token from now on (logout); returns False for invalid tokens"""
+        claims = self.verify(token)
+        if claims is None:
+            return False
+        self.revoke_id(claims['jti'], claims['exp'])
+        invalidation_bus.publish('tokens', [[claims['jti'], claims['exp']]])
+        try:
+            from services.supabase_service import supabase_service
+            supabase_service.save_revoked_token(claims['jti'], claims['exp'])
+        except Exception as e:
+            print(f"Warning: Could not store revoked token: {e}")
+        return True
+
+    def revoke_id(self, token_id, expires_at):
+        now = time.time()
+        with self._lock:
+            # Expired tokens fail verification anyway: drop them from the set
+            self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+            self._revoked[token_id] = expires_at
+
+    def load_revoked(self):
+        """Merge the revocations stored in the database into the in-memory set"""
+        try:
+            from services.supabase_service import supabase_service
+            revoked = supabase_service.get_revoked_tokens()
+        except Exception as e:
+            print(f"Warning: Could not load revoked tokens: {e}")
+            revoked = []
+        finally:
+            with self._lock:
+                self._revoked_loaded_at = time.time()
+                self._revoked_loading = False
+        for token_id, expires_at in revoked:
+            self.revoke_id(token_id, expires_at)
+
+    def _refresh_revoked(self):
+        """Load revocations on first use, then re-read them in the background"""
+        loaded_at = self._revoked_loaded_at
+        if loaded_at is None:
+            self.load_revoked()
+            return
+        with self._lock:
+            if self._revoked_loading or time.time() - loaded_at < Config.TOKEN_REVOCATION_REFRESH:
+                return
+            self._revoked_loading = True
+        executor.submit(self.load_revoked)
+
+    def _on_revoked(self, keys):
+        """Logouts handled by other workers: [token id, expiry] pairs"""
+        for token_id, expires_at in keys:
+            self.revoke_id(token_id, expires_at)
+
+    def stats(self):
+        return {'verified_cache': self.verified.stats(), 'revoked': len(self._revoked)}
+
+# Create global instance
+auth_tokens = AuthTokens()
+
+
+def bearer_token():
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Bearer '):
+        return header[len('Bearer '):].strip()
+    return None
+
+
+def load_identity():
+    """Set g.user_id / g.user_type / g.company_id from the request's token; returns its claims or None"""
+    claims = auth_tokens.verify(bearer_token())
+    g.user_id = claims['uid'] if claims else None
+    g.user_type = claims['typ'] if claims else None
+    g.company_id = claims.get('cid') if claims else None
+    return claims
+
+
+def public(view):
+    """Mark a blueprint view as reachable without a token (identity is still loaded when present)"""
+    view.public = True
+    return view
+
+
+def authenticate():
+    """
+    before_request hook for blueprints: 401 unless the request carries a
+    valid token, except for views marked @public and CORS preflights
+    """
+    if request.method == 'OPTIONS':
+        return None
+    claims = load_identity()
+    view = current_app.view_functions.get(request.endpoint)
+    if claims is None and not getattr(view, 'public', False):
+        return jsonify({'error': 'Authentication required'}), 401
+    return None
+
+
+def login_required(view):
+    """Same check as authenticate() for routes registered directly on the app"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if load_identity() is None:
+            return jsonify({'error': 'Authentication required'}), 401
+        return view(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,236 @@
+# Caching helpers
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Marker stored for lookups that returned nothing, so misses can be cached too
+NEGATIVE = {'__negative__': True}
+
+
+class TTLCache:
+    """Thread-safe in-process LRU cache with per-entry expiry"""
+
+    def __init__(self, max_size=1024, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at < time.time():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {'size': len(self._data), 'hits': self.hits, 'misses': self.misses}
+
+
+class SQLiteCache:
+    """
+    On-disk key/value cache backed by SQLite.
+    The file survives restarts and is shared by every gunicorn worker on the host.
+    """
+
+    def __init__(self, path, max_entries=None):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS cache ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)')
+        conn.commit()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get_entry(self, key):
+        """Return (value, expires_at) for a live entry, or None"""
+        try:
+            row = self._connect().execute(
+                'SELECT value, expires_at FROM cache WHERE key = ?', (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Cache read error: {e}")
+            return None
+        if row is None or row[1] < time.time():
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0]), row[1]
+
+    def get(self, key, default=None):
+        entry = self.get_entry(key)
+        return entry[0] if entry else default
+
+    def set(self, key, value, ttl):
+        try:
+            conn = self._connect()
+            conn.execute(
+                'INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)',
+                (key, json.dumps(value), time.time() + ttl)
+            )
+            if self.max_entries:
+                # Evict the entries closest to expiry once over the bound
+                excess = conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0] - self.max_entries
+                if excess > 0:
+                    conn.execute(
+                        'DELETE FROM cache WHERE key IN '
+                        '(SELECT key FROM cache ORDER BY expires_at ASC LIMIT ?)', (excess,)
+                    )
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"Cache write error: {e}")
+
+    def delete(self, key):
+        try:
+            conn = self._connect()
+            conn.execute('DELETE FROM cache WHERE key = ?', (key,))
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"Cache delete error: {e}")
+
+    def purge_expired(self):
+        conn = self._connect()
+        conn.execute('DELETE FROM cache WHERE expires_at < ?', (time.time(),))
+        conn.commit()
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+class TieredCache:
+    """
+    Two-tier cache: a fast in-process LRU in front of a shared SQLite store.
+    Disk hits are promoted into memory for the rest of their lifetime.
+    """
+
+    def __init__(self, path=None, max_size=1024, ttl=300, disk_max_entries=None):
+        self.memory = TTLCache(max_size=max_size, ttl=ttl)
+        self.disk = None
+        if path:
+            try:
+                self.disk = SQLiteCache(path, max_entries=disk_max_entries)
+            except sqlite3.Error as e:
+                print(f"Warning: Could not open cache database {path}: {e}")
+
+    def get(self, key, default=None):
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        if self.disk:
+            entry = self.disk.get_entry(key)
+            if entry:
+                value, expires_at = entry
+                self.memory.set(key, value, expires_at - time.time())
+                return value
+        return default
+
+    def set(self, key, value, ttl=None):
+        ttl = self.memory.ttl if ttl is None else ttl
+        self.memory.set(key, value, ttl)
+        if self.disk:
+            self.disk.set(key, value, ttl)
+
+    def delete(self, key):
+        self.memory.delete(key)
+        if self.disk:
+            self.disk.delete(key)
+
+    def stats(self):
+        return {
+            'memory': self.memory.stats(),
+            'disk': self.disk.stats() if self.disk else None
+        }
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one: the first caller
+    runs the function, the others wait for and share its result.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.shared = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
@@ -0,0 +1,36 @@
+# Concurrency helpers
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from config import Config
+
+# Shared bounded pool for fanning out independent I/O-bound lookups
+executor = ThreadPoolExecutor(max_workers=Config.FANOUT_WORKERS, thread_name_prefix='fanout')
+
+
+def run_concurrently(tasks, timeout=None):
+    """
+    Run named callables on the shared pool and wait for all of them.
+
+    Args:
+        tasks: dict of name -> zero-argument callable
+        timeout: overall deadline in seconds
+
+    Returns:
+        (results, errors): dicts keyed by task name; a task that raised or
+        missed the deadline appears only in errors
+    """
+    futures = {name: executor.submit(fn) for name, fn in tasks.items()}
+    wait(futures.values(), timeout=timeout)
+
+    results = {}
+    errors = {}
+    for name, future in futures.items():
+        if not future.done():
+            future.cancel()
+            errors[name] = 'timeout'
+            continue
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            errors[name] = str(e)
+    return results, errors
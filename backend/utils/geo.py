@@ -0,0 +1,133 @@
+# Geo helpers
+import math
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371000
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+_DECODE = {c: i for i, c in enumerate(_BASE32)}
+
+
+def geohash_encode(lat, lng, precision=6):
+    """Encode coordinates into a geohash cell of the given length"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        rng, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits = bits << 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+
+def geohash_bounds(cell):
+    """Return (min_lat, max_lat, min_lng, max_lng) of a geohash cell"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    even = True
+    for c in cell:
+        bits = _DECODE[c]
+        for shift in range(4, -1, -1):
+            rng = lng_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if (bits >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return lat_range[0], lat_range[1], lng_range[0], lng_range[1]
+
+
+def geohash_center(cell):
+    """Return the (lat, lng) center of a geohash cell"""
+    min_lat, max_lat, min_lng, max_lng = geohash_bounds(cell)
+    return (min_lat + max_lat) / 2, (min_lng + max_lng) / 2
+
+
+def geohash_neighbours(cell):
+    """Return the 8 cells surrounding a geohash cell"""
+    min_lat, max_lat, min_lng, max_lng = geohash_bounds(cell)
+    lat, lng = (min_lat + max_lat) / 2, (min_lng + max_lng) / 2
+    d_lat = max_lat - min_lat
+    d_lng = max_lng - min_lng
+    neighbours = []
+    for dy in (-1, 0, 1):
+        for dx in (-1, 0, 1):
+            if dx == 0 and dy == 0:
+                continue
+            n_lat = lat + dy * d_lat
+            if not -90 <= n_lat <= 90:
+                continue
+            n_lng = (lng + dx * d_lng + 180) % 360 - 180
+            neighbours.append(geohash_encode(n_lat, n_lng, len(cell)))
+    return neighbours
+
+
+def parse_location(location):
+    """Return (lat, lng) floats from a {lat, lng} dict, or None"""
+    if not location or not isinstance(location, dict):
+        return None
+    try:
+        lat = float(location.get('lat'))
+        lng = float(location.get('lng'))
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return lat, lng
+
+
+def row_coordinates(row):
+    """Return (lat, lng) of a service or company row, or None"""
+    if row.get('location'):
+        return parse_location(row['location'])
+    if row.get('lat') is not None:
+        return parse_location({'lat': row.get('lat'), 'lng': row.get('lng')})
+    if row.get('latitude') is not None:
+        return parse_location({'lat': row.get('latitude'), 'lng': row.get('longitude')})
+    return None
+
+
+def haversine(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two points in meters"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    delta_phi = math.radians(lat2 - lat1)
+    delta_lambda = math.radians(lng2 - lng1)
+    a = math.sin(delta_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2) ** 2
+    return EARTH_RADIUS_M * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def haversine_np(lat, lng, lats, lngs):
+    """Vectorized great-circle distances in meters from one point to arrays of points"""
+    phi1 = np.radians(lat)
+    phi2 = np.radians(lats)
+    delta_phi = phi2 - phi1
+    delta_lambda = np.radians(lngs) - np.radians(lng)
+    a = np.sin(delta_phi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(delta_lambda / 2) ** 2
+    return EARTH_RADIUS_M * 2 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def haversine_matrix(origin_lats, origin_lngs, dest_lats, dest_lngs):
+    """Vectorized N x M great-circle distance matrix in meters"""
+    return haversine_np(
+        np.asarray(origin_lats, dtype=float)[:, None],
+        np.asarray(origin_lngs, dtype=float)[:, None],
+        np.asarray(dest_lats, dtype=float)[None, :],
+        np.asarray(dest_lngs, dtype=float)[None, :]
+    )
@@ -0,0 +1,67 @@
+# Conditional GET (ETag / 304) and response compression
+import gzip
+import hashlib
+
+from flask import request
+
+from config import Config
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/', 'application/javascript')
+
+
+def _negotiate_encoding(response):
+    """'br', 'gzip' or None for this response and the request's Accept-Encoding"""
+    if response.headers.get('Content-Encoding') or response.content_length is None:
+        return None
+    if response.content_length < Config.COMPRESS_MIN_SIZE:
+        return None
+    if not (response.mimetype or '').startswith(COMPRESSIBLE_TYPES):
+        return None
+    accepted = request.accept_encodings
+    if brotli and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def conditional_response(response):
+    """
+    after_request hook: tag successful GET responses with a strong ETag
+    (per content encoding), answer a matching If-None-Match with 304 and
+    compress large text bodies. Streamed responses are passed through.
+    """
+    if request.method not in ('GET', 'HEAD') or response.status_code != 200:
+        return response
+    if response.is_streamed or response.direct_passthrough:
+        return response
+
+    body = response.get_data()
+    encoding = _negotiate_encoding(response)
+    digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+    response.set_etag(f"{digest}-{encoding}" if encoding else digest)
+    response.vary.add('Accept-Encoding')
+    if request.headers.get('Authorization'):
+        # Per-user bodies must not be served from shared caches
+        response.vary.add('Authorization')
+        response.cache_control.private = True
+    if not response.cache_control.no_store and not response.cache_control.max_age:
+        # Let clients keep the body but revalidate it on every use
+        response.cache_control.no_cache = True
+
+    response.make_conditional(request)
+    if response.status_code == 304 or not encoding:
+        return response
+
+    if encoding == 'br':
+        compressed = brotli.compress(body, quality=Config.COMPRESS_LEVEL)
+    else:
+        compressed = gzip.compress(body, compresslevel=Config.COMPRESS_LEVEL)
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    return response
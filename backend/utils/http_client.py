@@ -0,0 +1,205 @@
+# Shared outbound HTTP layer for external providers (ElevenLabs, SerpApi, OpenAI)
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter, BaseAdapter
+
+from config import Config
+
+# Statuses worth retrying: rate limiting and upstream failures
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class ProviderUnavailableError(RuntimeError):
+    """Raised without calling the upstream: circuit open or concurrency limit reached"""
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures and fails fast for
+    `reset_timeout` seconds, then lets a single trial call through (half-open).
+    """
+
+    def __init__(self, threshold, reset_timeout):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        """
+        Whether a call may go through: 'closed', 'half-open' for the single
+        trial call, or None while the circuit is open
+        """
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return state
+            if state == 'half-open' and not self._trial:
+                self._trial = True
+                return state
+            return None
+
+    def end_trial(self):
+        """Free the trial slot when a call ended without recording success or failure"""
+        with self._lock:
+            self._trial = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial = False
+            if self.failures >= self.threshold or self.opened_at is not None:
+                self.opened_at = time.monotonic()
+
+
+class Provider:
+    """
+    One upstream: a keep-alive session with a connection pool, a cap on
+    concurrent calls, retries with jittered exponential backoff and a circuit breaker.
+    """
+
+    def __init__(self, name, max_concurrency, timeout, retries=None):
+        self.name = name
+        self.timeout = timeout
+        self.retries = Config.HTTP_MAX_RETRIES if retries is None else retries
+        self.breaker = CircuitBreaker(Config.HTTP_BREAKER_THRESHOLD, Config.HTTP_BREAKER_RESET)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def mount(self, adapter):
+        """Route this provider's requests through another transport adapter (e.g. SimulatedUpstream)"""
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _backoff(self, attempt):
+        # Full jitter: uniform in [0, base * 2^attempt]
+        time.sleep(random.uniform(0, Config.HTTP_BACKOFF_BASE * (2 ** attempt)))
+
+    def call(self, fn, *args, retry_on=(Exception,), **kwargs):
+        """Run fn under this provider's concurrency limit, retry policy and circuit breaker"""
+        # Take the slot first so that a half-open trial is never claimed by a call that can't run
+        if not self._slots.acquire(timeout=Config.HTTP_ACQUIRE_TIMEOUT):
+            raise ProviderUnavailableError(f"{self.name} is at its concurrency limit")
+        admitted = self.breaker.allow()
+        if not admitted:
+            self._slots.release()
+            raise ProviderUnavailableError(f"{self.name} circuit is open")
+        try:
+            attempt = 0
+            while True:
+                try:
+                    result = fn(*args, **kwargs)
+                except retry_on:
+                    if attempt >= self.retries:
+                        self.breaker.record_failure()
+                        raise
+                else:
+                    self.breaker.record_success()
+                    return result
+                self._backoff(attempt)
+                attempt += 1
+        finally:
+            if admitted == 'half-open':
+                # Errors outside retry_on (e.g. a 400 from the SDK) say nothing about availability
+                self.breaker.end_trial()
+            self._slots.release()
+
+    def request(self, method, url, **kwargs):
+        """HTTP request through the pooled session; retries connection errors and 429/5xx"""
+        kwargs.setdefault('timeout', self.timeout)
+        files = kwargs.get('files') or {}
+        attempts = []
+
+        def send():
+            if attempts:
+                # Rewind uploads before sending them again
+                for value in files.values():
+                    stream = value[1] if isinstance(value, tuple) else value
+                    if hasattr(stream, 'seek'):
+                        stream.seek(0)
+            attempts.append(1)
+            response = self.session.request(method, url, **kwargs)
+            if response.status_code in RETRY_STATUSES:
+                raise requests.HTTPError(f"{self.name} returned {response.status_code}", response=response)
+            return response
+
+        return self.call(send, retry_on=(requests.ConnectionError, requests.Timeout, requests.HTTPError))
+
+    def stats(self):
+        return {'circuit': self.breaker.state, 'consecutive_failures': self.breaker.failures}
+
+
+class SimulatedUpstream(BaseAdapter):
+    """
+    Transport adapter standing in for a real upstream in tests and load runs:
+    responds after `latency` seconds, fails a `failure_rate` share of requests
+    with `failure_status` (or a connection error when it is None).
+    """
+
+    def __init__(self, latency=0.0, failure_rate=0.0, failure_status=503, body=b'{}', status=200):
+        super().__init__()
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.body = body
+        self.status = status
+        self.calls = 0
+
+    def send(self, request, timeout=None, **kwargs):
+        self.calls += 1
+        read_timeout = timeout[1] if isinstance(timeout, tuple) else timeout
+        if read_timeout is not None and self.latency > read_timeout:
+            time.sleep(read_timeout)
+            raise requests.ReadTimeout(f"Simulated upstream timed out after {read_timeout}s", request=request)
+        time.sleep(self.latency)
+
+        status = self.status
+        if random.random() < self.failure_rate:
+            if self.failure_status is None:
+                raise requests.ConnectionError('Simulated upstream connection failure', request=request)
+            status = self.failure_status
+
+        response = requests.Response()
+        response.status_code = status
+        response._content = self.body
+        response.headers['Content-Type'] = 'application/json'
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+providers = {
+    # Uploads are slow to repeat, so transcription gets a single retry
+    'elevenlabs': Provider('elevenlabs', Config.ELEVENLABS_MAX_CONCURRENCY, timeout=30, retries=1),
+    'serpapi': Provider('serpapi', Config.SERPAPI_MAX_CONCURRENCY, timeout=15),
+    'openai': Provider('openai', Config.OPENAI_MAX_CONCURRENCY, timeout=30),
+}
+
+
+def get_provider(name):
+    return providers[name]
@@ -0,0 +1,153 @@
+# Cross-worker cache invalidation
+import atexit
+import glob
+import json
+import os
+import socket
+import threading
+from collections import Counter, defaultdict
+
+from config import Config
+
+# Keys per datagram; larger key lists are split over several messages
+MAX_KEYS_PER_MESSAGE = 500
+RECV_BUFFER = 65536
+
+
+class InvalidationBus:
+    """
+    Broadcasts keyed invalidations to the other worker processes on the host.
+
+    Every process binds a Unix datagram socket <directory>/<pid>.sock.
+    publish(topic, keys) sends one small JSON datagram to every other socket
+    in the directory; a daemon thread in each receiver calls the handlers
+    subscribed to that topic. The publisher has already updated its own
+    state, so its handlers are not called. Sockets of dead processes are
+    removed on the first failed send. A message lost to a full receive
+    buffer only leaves that worker stale until its caches expire.
+    """
+
+    def __init__(self, directory=None, enabled=None):
+        self.directory = directory or Config.INVALIDATION_DIR
+        self.enabled = Config.INVALIDATION_ENABLED if enabled is None else enabled
+        if self.enabled and not hasattr(socket, 'AF_UNIX'):
+            print("Warning: Unix sockets not available. Cross-worker invalidation disabled.")
+            self.enabled = False
+        self.handlers = defaultdict(list)  # topic -> [handler(keys)]
+        self.counters = Counter()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._path = None
+        self._socket = None
+        self._registered = False
+
+    def subscribe(self, topic, handler):
+        self.handlers[topic].append(handler)
+
+    def start(self):
+        """Bind this process's socket and start listening (again after a fork)"""
+        if not self.enabled:
+            return False
+        with self._lock:
+            if self._pid == os.getpid():
+                return True
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                self._pid = os.getpid()
+                self._path = os.path.join(self.directory, f"{self._pid}.sock")
+                if os.path.exists(self._path):
+                    os.unlink(self._path)  # left behind by a dead process with a recycled pid
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+                sock.bind(self._path)
+                self._socket = sock
+            except OSError as e:
+                print(f"Warning: Could not start invalidation bus: {e}")
+                self._pid = None
+                return False
+            threading.Thread(target=self._listen, args=(sock,), name='invalidation-bus', daemon=True).start()
+            if not self._registered:
+                # gunicorn --preload forks after import: each worker needs its own socket
+                os.register_at_fork(after_in_child=self._after_fork)
+                atexit.register(self.stop)
+                self._registered = True
+            return True
+
+    def _after_fork(self):
+        # The parent's socket and listener thread belong to the parent
+        self._lock = threading.Lock()
+        self._pid = None
+        self._socket = None
+        self.start()
+
+    def stop(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+            try:
+                os.unlink(self._path)
+            except OSError:
+                pass
+            self._socket.close()
+            self._pid = None
+
+    def publish(self, topic, keys):
+        """Ask the other workers to invalidate `keys` (JSON-serialisable) under `topic`"""
+        keys = [k for k in keys if k is not None]
+        if not keys or not self.start():
+            return
+        own = self._path
+        peers = [p for p in glob.glob(os.path.join(self.directory, '*.sock')) if p != own]
+        if not peers:
+            return
+        sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sender.setblocking(False)
+        try:
+            for start in range(0, len(keys), MAX_KEYS_PER_MESSAGE):
+                message = json.dumps({'topic': topic, 'keys': keys[start:start + MAX_KEYS_PER_MESSAGE]}).encode()
+                for peer in peers:
+                    self._send(sender, message, peer)
+        finally:
+            sender.close()
+        self.counters['published'] += 1
+
+    def _send(self, sender, message, peer):
+        try:
+            sender.sendto(message, peer)
+            self.counters['sent'] += 1
+        except (ConnectionRefusedError, FileNotFoundError):
+            # Nobody listening: the process has exited
+            try:
+                os.unlink(peer)
+            except OSError:
+                pass
+        except OSError as e:
+            # Receive buffer full (BlockingIOError) or message too large
+            self.counters['dropped'] += 1
+            print(f"Warning: Invalidation to {os.path.basename(peer)} dropped: {e}")
+
+    def _listen(self, sock):
+        while True:
+            try:
+                data = sock.recv(RECV_BUFFER)
+            except OSError:
+                return  # socket closed by stop()
+            try:
+                message = json.loads(data)
+                topic, keys = message['topic'], message['keys']
+            except (ValueError, KeyError, TypeError):
+                continue
+            self.counters['received'] += 1
+            for handler in self.handlers.get(topic, ()):
+                try:
+                    handler(keys)
+                except Exception as e:
+                    print(f"Warning: Invalidation handler for {topic} failed: {e}")
+
+    def stats(self):
+        listening = self._pid == os.getpid()
+        peers = len(glob.glob(os.path.join(self.directory, '*.sock'))) - 1 if listening else 0
+        return {'enabled': self.enabled, 'listening': listening, 'peers': peers,
+                **dict(self.counters)}
+
+# Create global instance
+invalidation_bus = InvalidationBus()
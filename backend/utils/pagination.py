@@ -0,0 +1,40 @@
+# Keyset pagination helpers
+import base64
+import json
+
+from config import Config
+from utils.validators import parse_int
+
+
+class Page(list):
+    """A page of rows; next_cursor is None on the last page"""
+
+    def __init__(self, rows=(), next_cursor=None):
+        super().__init__(rows)
+        self.next_cursor = next_cursor
+
+
+def encode_cursor(row_id):
+    """Opaque cursor pointing after the row with this id"""
+    raw = json.dumps({'id': row_id}, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Row id a cursor points after, or None for no cursor. Raises ValueError if malformed"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        row_id = json.loads(raw)['id']
+    except (ValueError, TypeError, KeyError) as e:
+        raise ValueError('Invalid cursor') from e
+    if isinstance(row_id, bool) or not isinstance(row_id, (int, str)):
+        raise ValueError('Invalid cursor')
+    return row_id
+
+
+def page_args(args):
+    """(limit, after) from request args; raises ValueError for a malformed cursor"""
+    limit = parse_int(args.get('limit'), Config.PAGE_DEFAULT_LIMIT, 1, Config.PAGE_MAX_LIMIT)
+    return limit, decode_cursor(args.get('after'))
@@ -0,0 +1,12 @@
+# Streaming response helpers (server-sent events / NDJSON)
+import json
+
+
+def sse_event(event, data):
+    """Format one server-sent event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def ndjson_line(data):
+    """Format one newline-delimited JSON record"""
+    return json.dumps(data, default=str) + "\n"
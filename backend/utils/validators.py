@@ -2,6 +2,8 @@
 import re
 import hashlib
 
+from services.repository import SCHEMA
+
 def validate_email(email):
     """Validate email format"""
     pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
@@ -29,3 +31,38 @@ def validate_user_type(user_type):
     """Validate user type"""
     return user_type in ['client', 'company']
 
+
+
+def parse_int(value, default, minimum=None, maximum=None):
+    """Parse an integer request parameter, clamping it to [minimum, maximum]"""
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        return default
+    if minimum is not None:
+        number = max(number, minimum)
+    if maximum is not None:
+        number = min(number, maximum)
+    return number
+
+# Columns clients may ask for with ?fields=, per table: the real columns from
+# the repository schema, so a projection never names a column that doesn't exist
+FIELD_WHITELISTS = {
+    table: {'id', 'created_at', *SCHEMA[table]}
+    for table in ('services', 'masters', 'bookings', 'companies', 'favorites')
+}
+
+def parse_fields(table, value):
+    """
+    Column projection for a ?fields=a,b,c parameter: a select() string with
+    'id' always included, or '*' when no fields were requested.
+    Raises ValueError for columns not whitelisted for the table.
+    """
+    if not value:
+        return '*'
+    fields = [f.strip() for f in str(value).split(',') if f.strip()]
+    unknown = [f for f in fields if f not in FIELD_WHITELISTS[table]]
+    if unknown:
+        raise ValueError(f"Unknown fields for {table}: {', '.join(unknown)}")
+    columns = ['id'] + [f for f in dict.fromkeys(fields) if f != 'id']
+    return ','.join(columns)
@@ -70,6 +70,37 @@ class APIClient {
         return this.request(endpoint, { method: 'DELETE' });
     }
 
+    // POST and read a newline-delimited JSON response, calling onRecord per line
+    async stream(endpoint, data, onRecord) {
+        const response = await fetch(`${this.baseURL}${endpoint}`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Accept': 'application/x-ndjson',
+                ...(this.token && { 'Authorization': `Bearer ${this.token}` }),
+            },
+            body: JSON.stringify(data),
+        });
+        if (!response.ok) {
+            throw new Error(`Request failed with status ${response.status}`);
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+            lines.filter(line => line.trim()).forEach(line => onRecord(JSON.parse(line)));
+        }
+        if (buffer.trim()) {
+            onRecord(JSON.parse(buffer));
+        }
+    }
+
     setToken(token) {
         this.token = token;
         if (token) {
@@ -95,8 +126,12 @@ const API = {
     },
 
     async logout() {
+        try {
+            await api.post('/auth/logout', {});
+        } catch (error) {
+            // Token already invalid: nothing to revoke
+        }
         api.setToken(null);
-        return Promise.resolve();
     },
 
     // Services
@@ -104,6 +139,11 @@ const API = {
         return api.post('/services/search', { query, ...filters });
     },
 
+    // Streamed search: onRecord gets 'page', 'service' and 'summary' records as they arrive
+    async searchServicesStream(query, filters = {}, onRecord) {
+        return api.stream('/services/search', { query, ...filters, stream: 'ndjson' }, onRecord);
+    },
+
     async getService(serviceId) {
         return api.get(`/services/${serviceId}`);
     },
@@ -120,6 +160,14 @@ const API = {
         return api.get(`/services/${serviceId}/examples`);
     },
 
+    async getServiceFull(serviceId, masterId, date) {
+        const params = new URLSearchParams();
+        if (masterId) params.set('master_id', masterId);
+        if (date) params.set('date', date);
+        const query = params.toString();
+        return api.get(`/services/${serviceId}/full${query ? `?${query}` : ''}`);
+    },
+
     async getAvailableTimeSlots(serviceId, masterId, date) {
         return api.get(`/services/${serviceId}/time-slots?master_id=${masterId}&date=${date}`);
     },
@@ -129,8 +177,21 @@ const API = {
         return api.post('/bookings', bookingData);
     },
 
-    async getBookings(userId) {
-        return api.get(`/bookings?user_id=${userId}`);
+    // List endpoints are paged: pass the previous response's next_cursor as `after`,
+    // or use getAllPages to follow the cursors until the last page
+    async getAllPages(fetchPage, key) {
+        const rows = [];
+        let after = null;
+        do {
+            const result = await fetchPage(after);
+            rows.push(...(result[key] || []));
+            after = result.next_cursor;
+        } while (after);
+        return rows;
+    },
+
+    async getBookings(userId, after) {
+        return api.get(`/bookings?user_id=${userId}${after ? `&after=${encodeURIComponent(after)}` : ''}`);
     },
 
     async rescheduleBooking(bookingId, newDate, newTime) {
@@ -153,8 +214,8 @@ const API = {
         return api.delete(`/favorites/${serviceId}`);
     },
 
-    async getFavorites() {
-        return api.get('/favorites');
+    async getFavorites(after) {
+        return api.get(`/favorites${after ? `?after=${encodeURIComponent(after)}` : ''}`);
     },
 
     // Client Settings
@@ -183,8 +244,8 @@ const API = {
         return api.get('/companies/settings');
     },
 
-    async getMasters() {
-        return api.get('/companies/masters');
+    async getMasters(after) {
+        return api.get(`/companies/masters${after ? `?after=${encodeURIComponent(after)}` : ''}`);
     },
 
     async createMaster(masterData) {
@@ -203,8 +264,8 @@ const API = {
         return api.post('/companies/promotions', promotionData);
     },
 
-    async getPromotions() {
-        return api.get('/companies/promotions');
+    async getPromotions(after) {
+        return api.get(`/companies/promotions${after ? `?after=${encodeURIComponent(after)}` : ''}`);
     },
 
     async deletePromotion(promotionId) {
@@ -132,8 +132,7 @@ document.addEventListener('DOMContentLoaded', async () => {
 
     async function loadBookings() {
         try {
-            const result = await API.getBookings(auth.currentUser.id);
-            const bookings = result.bookings || [];
+            const bookings = await API.getAllPages(after => API.getBookings(auth.currentUser.id, after), 'bookings');
             displayBookings(bookings);
         } catch (error) {
             console.error('Error loading bookings:', error);
@@ -198,8 +198,8 @@ document.addEventListener('DOMContentLoaded', async () => {
 
     async function loadMasters() {
         try {
-            const result = await API.getMasters();
-            displayMasters(result.masters || []);
+            const masters = await API.getAllPages(after => API.getMasters(after), 'masters');
+            displayMasters(masters);
         } catch (error) {
             console.error('Error loading masters:', error);
         }
@@ -353,8 +353,8 @@ document.addEventListener('DOMContentLoaded', async () => {
 
     async function loadPromotions() {
         try {
-            const result = await API.getPromotions();
-            displayPromotions(result.promotions || []);
+            const promotions = await API.getAllPages(after => API.getPromotions(after), 'promotions');
+            displayPromotions(promotions);
         } catch (error) {
             console.error('Error loading promotions:', error);
         }
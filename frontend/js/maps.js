@@ -165,6 +165,34 @@ class MapsService {
         }
     }
 
+    /**
+     * Calculate distances from several origins to several destinations in one request
+     * Returns a matrix of distances in km (null where a point is invalid)
+     */
+    async calculateDistanceMatrix(origins, destinations) {
+        try {
+            const response = await fetch(`${this.apiUrl}/maps/distance-matrix`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'Authorization': `Bearer ${localStorage.getItem('auth_token') || ''}`
+                },
+                body: JSON.stringify({ origins, destinations })
+            });
+
+            if (!response.ok) {
+                throw new Error('Distance matrix calculation failed');
+            }
+
+            const data = await response.json();
+            return data.rows.map(row => row.map(cell => cell ? cell.distance_meters / 1000 : null));
+        } catch (error) {
+            console.error('Distance matrix calculation error:', error);
+            // Fallback: calculate locally using Haversine
+            return origins.map(origin => destinations.map(destination => this.calculateDistanceLocal(origin, destination)));
+        }
+    }
+
     /**
      * Local distance calculation using Haversine formula (fallback)
      */
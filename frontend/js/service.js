@@ -384,8 +384,8 @@ document.addEventListener('DOMContentLoaded', async () => {
 
     async function checkFavoriteStatus(id) {
         try {
-            const favorites = await API.getFavorites();
-            isFavorite = favorites.some(f => f.service_id === id);
+            const favorites = await API.getAllPages(after => API.getFavorites(after), 'favorites');
+            isFavorite = favorites.some(f => String(f.service_id) === String(id));
         } catch (error) {
             // Check localStorage
             const favorites = JSON.parse(localStorage.getItem('favorites') || '[]');
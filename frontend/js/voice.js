@@ -23,7 +23,7 @@ class VoiceService {
             };
 
             this.mediaRecorder.onstop = async () => {
-                const audioBlob = new Blob(this.audioChunks, { type: 'audio/wav' });
+                const audioBlob = new Blob(this.audioChunks, { type: this.mediaRecorder.mimeType || 'audio/webm' });
                 const text = await this.processAudio(audioBlob);
                 stream.getTracks().forEach(track => track.stop());
                 
@@ -57,11 +57,17 @@ class VoiceService {
         return false;
     }
 
+    fileExtension(mimeType) {
+        // MediaRecorder produces webm (Chrome/Firefox) or mp4 (Safari), never wav
+        const type = (mimeType || '').split(';')[0];
+        return { 'audio/webm': 'webm', 'audio/ogg': 'ogg', 'audio/mp4': 'm4a', 'audio/wav': 'wav' }[type] || 'webm';
+    }
+
     async processAudio(audioBlob) {
         try {
             // Send audio to backend for processing with OpenAI Whisper
             const formData = new FormData();
-            formData.append('audio', audioBlob, 'recording.wav');
+            formData.append('audio', audioBlob, `recording.${this.fileExtension(audioBlob.type)}`);
 
             const response = await fetch(`${CONFIG.API_URL}/voice/transcribe`, {
                 method: 'POST',
@@ -75,7 +81,12 @@ class VoiceService {
                 throw new Error('Transcription failed');
             }
 
-            const data = await response.json();
+            let data = await response.json();
+
+            // Long transcriptions run as background jobs: poll until finished
+            if (response.status === 202 && data.job_id) {
+                data = await this.waitForJob(data.job_id);
+            }
             
             // Return transcribed text
             if (data.text) {
@@ -90,6 +101,25 @@ class VoiceService {
         }
     }
 
+    async waitForJob(jobId, timeoutMs = 60000) {
+        const deadline = Date.now() + timeoutMs;
+        while (Date.now() < deadline) {
+            await new Promise(resolve => setTimeout(resolve, 500));
+            const response = await fetch(`${CONFIG.API_URL}/voice/jobs/${jobId}`);
+            if (!response.ok) {
+                throw new Error('Transcription job not found');
+            }
+            const job = await response.json();
+            if (job.status === 'done') {
+                return job;
+            }
+            if (job.status === 'failed') {
+                throw new Error(job.error || 'Transcription failed');
+            }
+        }
+        throw new Error('Transcription timed out');
+    }
+
     fallbackSpeechRecognition() {
         return new Promise((resolve, reject) => {
             if (!('webkitSpeechRecognition' in window) && !('SpeechRecognition' in window)) {
@@ -163,6 +193,61 @@ class VoiceService {
     async transcribeAudio(audioBlob) {
         return this.processAudio(audioBlob);
     }
+
+    // Transcribe and search in one request; onEvent(event, data) is called for
+    // 'transcript', 'services', 'external', 'done' and 'error' as they arrive.
+    // Long recordings come back as a transcription job (202): wait for it,
+    // then stream the search for the job's transcript.
+    async searchByVoice(audioBlob, userLocation, onEvent) {
+        const post = (fill) => {
+            const formData = new FormData();
+            fill(formData);
+            if (userLocation) {
+                formData.append('user_location', JSON.stringify(userLocation));
+            }
+            return fetch(`${CONFIG.API_URL}/voice/search`, {
+                method: 'POST',
+                headers: {
+                    'Authorization': `Bearer ${localStorage.getItem('auth_token') || ''}`,
+                },
+                body: formData,
+            });
+        };
+
+        let response = await post(formData => formData.append('audio', audioBlob, `recording.${this.fileExtension(audioBlob.type)}`));
+        if (response.status === 202) {
+            const job = await response.json();
+            await this.waitForJob(job.job_id);
+            response = await post(formData => formData.append('job_id', job.job_id));
+        }
+        if (!response.ok) {
+            throw new Error('Voice search failed');
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const block = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                let event = 'message';
+                let data = '';
+                block.split('\n').forEach(line => {
+                    if (line.startsWith('event: ')) event = line.slice(7);
+                    else if (line.startsWith('data: ')) data += line.slice(6);
+                });
+                if (data) {
+                    onEvent(event, JSON.parse(data));
+                }
+            }
+        }
+    }
 }
 
 // Create global voice service instance